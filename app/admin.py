@@ -1,44 +1,160 @@
 from typing import Union
 
+from django.conf import settings
 from django.contrib import admin, messages
 from django import forms
-from django.db.models.query_utils import Q
+from django.core.exceptions import PermissionDenied
+from django.db.transaction import atomic
+from django.forms.models import BaseInlineFormSet
+from django.http import HttpResponseBadRequest
 from django.http.request import HttpRequest
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import redirect, render
+from django.urls import path
 from django.urls.base import reverse_lazy
 from unfold.admin import ModelAdmin, StackedInline, TabularInline
 from unfold.decorators import action
+from unfold.forms import ActionForm
 # from unfold.enums import ActionVariant
-from app.models import Compte, Transaction
+from app import bulk, profiling
+from app.dashboard import CHART_OPTIONS, family_dashboards
+from app.exports import export_response
+from app.models import ArchivedTransaction, Compte, Transaction
+from app.pagination import TRANSACTION_KEYSET, KeysetPaginationMixin, after_cursor, decode_cursor, encode_cursor
+from app.permissions import get_compte, get_compte_access
+from app.search import COMPTE_SEARCH, TRANSACTION_SEARCH, FullTextSearchMixin
 from django.utils.translation import gettext as _
 
 
+# Nombre de comptes nommés dans les messages des actions groupées
+BULK_NAMES_SHOWN = 10
+
+
 class TransactionForm(forms.Form):
     amount = forms.DecimalField(decimal_places=2, max_digits=10, min_value=0)
 
 
+class CompteActionForm(ActionForm):
+    # Montant des actions groupées de la liste des comptes (crédit, débit)
+    amount = forms.DecimalField(
+        label="",
+        required=False,
+        decimal_places=2,
+        max_digits=10,
+        min_value=0,
+        widget=forms.NumberInput({
+            "class": "bg-white/20 font-medium px-3 py-2 rounded text-white w-32 placeholder:text-white/70",
+            "placeholder": _("Montant"),
+            "step": "0.01",
+        }),
+    )
+
+
+class TransactionAdminForm(forms.ModelForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        compte, amount = cleaned_data.get('compte'), cleaned_data.get('amount')
+        # Même règle que take_money ; l'écriture la revérifie sur le solde en base
+        if compte is not None and amount is not None and amount < 0 and compte.balance < -amount:
+            self.add_error('amount', _('Vous ne pouvez pas prélever plus que le total du compte'))
+        return cleaned_data
+
+
+class LatestTransactionsFormSet(BaseInlineFormSet):
+    """
+    N'affiche que les ``per_page`` dernières transactions du compte, les plus
+    anciennes sont chargées à la demande (voir ``CompteAdmin.transactions_fragment``).
+    """
+    per_page = 10
+
+    def get_queryset(self):
+        if not hasattr(self, '_latest'):
+            self._latest = list(super().get_queryset()[:self.per_page])
+            # Évite de recharger le compte pour chaque ligne (Transaction.__str__)
+            for transaction in self._latest:
+                transaction.compte = self.instance
+        return self._latest
+
+    @property
+    def next_cursor(self):
+        transactions = self.get_queryset()
+        if len(transactions) < self.per_page:
+            return None
+        return encode_cursor(transactions[-1])
+
+
 class TransactionsStackedInline(TabularInline):
     model = Transaction
+    formset = LatestTransactionsFormSet
+    template = "admin/app/compte/transactions_inline.html"
     extra = 0
     fields = ('created_at', 'amount', 'description')
-    ordering = ["-created_at"]
+    ordering = TRANSACTION_KEYSET
     readonly_fields = ('amount','description', 'created_at')
     can_delete = False
+    per_page = 10
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        return formset
 
     def has_add_permission(self, request, obj):
         return False
 
+    def has_view_permission(self, request, obj:Compte = None):
+        # L'historique est visible par le possesseur et le manager du compte
+        if obj is None:
+            return request.user.is_superuser or bool(get_compte_access(request).visible)
+        return get_compte_access(request).can_view(obj.pk)
+
 
 @admin.register(Compte)
-class CompteAdmin(ModelAdmin):
+class CompteAdmin(FullTextSearchMixin, KeysetPaginationMixin, ModelAdmin):
     list_display = ('name', 'salary', 'total', 'client', 'manager')
+    list_select_related = ('client', 'manager')
     search_fields = ['name']
+    search_table = COMPTE_SEARCH
     list_filter = ['manager', 'client']
     list_per_page = 10
 
     inlines = (TransactionsStackedInline, )
 
-    actions_detail = ["add_money", "take_money", "compress_compte_transactions"]
+    actions_detail = ["add_money", "take_money", "compress_compte_transactions", "archive_compte_transactions", "export_transactions_csv", "export_transactions_jsonl"]
+    actions_list = ["weekly_dashboard", "performance"]
+    actions = ["credit_selected", "debit_selected", "pay_salary_selected"]
+    action_form = CompteActionForm
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<path:object_id>/transactions/",
+                self.admin_site.admin_view(self.transactions_fragment),
+                name="app_compte_transactions",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def transactions_fragment(self, request: HttpRequest, object_id: str):
+        """
+        Lignes HTML des transactions qui suivent le curseur ``?cursor=``, pour
+        compléter l'historique affiché sur la page du compte.
+        """
+        if not get_compte_access(request).can_view(object_id):
+            raise PermissionDenied
+        per_page = TransactionsStackedInline.per_page
+        transactions = Transaction.objects.filter(compte_id=object_id).order_by(*TRANSACTION_KEYSET)
+        if 'cursor' in request.GET:
+            cursor = decode_cursor(request.GET['cursor'], Transaction)
+            if cursor is None:
+                # Renvoyer la première page ferait répéter des lignes au "charger plus"
+                return HttpResponseBadRequest("Curseur invalide.")
+            transactions = after_cursor(transactions, cursor)
+        transactions = list(transactions[:per_page])
+
+        response = render(request, "admin/app/compte/transactions_fragment.html", {"transactions": transactions})
+        if len(transactions) == per_page:
+            response["X-Next-Cursor"] = encode_cursor(transactions[-1])
+        return response
 
     def get_fields(self, request, obj=None):
         fields = ['name', 'salary', 'client', 'manager']
@@ -70,14 +186,92 @@ class CompteAdmin(ModelAdmin):
         description=_("Compresser les transactions"),
         # url_path="compre-transactions-action",
         # attrs={"target": "_blank"},
+        permissions=['compress_transactions']
     )
     def compress_compte_transactions(self, request: HttpRequest, object_id:int):
-        compte = get_object_or_404(Compte, pk=object_id)
+        compte = get_compte(request, object_id)
         compte.compress_transactions()
         return redirect(
             reverse_lazy("admin:app_compte_change", args=(object_id,))
         )
 
+    @action(
+        description=_("Archiver les transactions"),
+        url_path="archive-transactions",
+        permissions=['compress_transactions']
+    )
+    def archive_compte_transactions(self, request: HttpRequest, object_id:int):
+        compte = get_compte(request, object_id)
+        compte.compress_transactions(archive=True)
+        return redirect(
+            reverse_lazy("admin:app_compte_change", args=(object_id,))
+        )
+
+    @action(
+        description=_("Exporter les transactions (CSV)"),
+        url_path="export-csv",
+        icon="download",
+        permissions=['export_transactions']
+    )
+    def export_transactions_csv(self, request: HttpRequest, object_id: int):
+        compte = get_compte(request, object_id)
+        return export_response(compte.transactions.all(), 'csv', f"transactions-{compte.pk}", archived=compte.archived_transactions.all())
+
+    @action(
+        description=_("Exporter les transactions (JSON Lines)"),
+        url_path="export-jsonl",
+        icon="download",
+        permissions=['export_transactions']
+    )
+    def export_transactions_jsonl(self, request: HttpRequest, object_id: int):
+        compte = get_compte(request, object_id)
+        return export_response(compte.transactions.all(), 'jsonl', f"transactions-{compte.pk}", archived=compte.archived_transactions.all())
+
+    @action(
+        description=_("Entrées et sorties"),
+        url_path="weekly",
+        icon="bar_chart",
+        permissions=['view']
+    )
+    def weekly_dashboard(self, request: HttpRequest):
+        """
+        Entrées et sorties hebdomadaires des comptes visibles, un graphique par famille.
+        """
+        return render(
+            request,
+            "admin/app/weekly_dashboard.html",
+            {
+                "title": _("Entrées et sorties"),
+                "families": family_dashboards(self.get_queryset(request)),
+                "chart_options": CHART_OPTIONS,
+                **self.admin_site.each_context(request),
+            },
+        )
+
+    @action(
+        description=_("Performances"),
+        url_path="performance",
+        icon="speed",
+        permissions=['view_performance']
+    )
+    def performance(self, request: HttpRequest):
+        """
+        Temps de réponse par vue et requêtes les plus lentes, mesurés par
+        ``app.profiling.ProfilingMiddleware`` dans ce processus.
+        """
+        records = profiling.buffer.snapshot()
+        return render(
+            request,
+            "admin/app/performance.html",
+            {
+                "title": _("Performances"),
+                "enabled": "app.profiling.ProfilingMiddleware" in settings.MIDDLEWARE,
+                "record_count": len(records),
+                **profiling.summarize(records),
+                **self.admin_site.each_context(request),
+            },
+        )
+
     @action(
         description=_("Ajouter de l'argent au compte"),
         url_path="compte-add-action",
@@ -86,7 +280,7 @@ class CompteAdmin(ModelAdmin):
     )
     def add_money(self, request: HttpRequest, object_id: int) -> str:
         # Check if object already exists, otherwise returs 404
-        obj = get_object_or_404(Compte, pk=object_id)
+        obj = get_compte(request, object_id)
         form = TransactionForm(request.POST or None)
 
         if request.method == "POST" and form.is_valid():
@@ -96,7 +290,6 @@ class CompteAdmin(ModelAdmin):
                 obj.add_money(amount)
             except ValueError as e:
                 messages.error(request, e)
-            obj.save()
 
             messages.success(request, _(f"Le compte a été crédité de {amount}€"))
 
@@ -115,7 +308,7 @@ class CompteAdmin(ModelAdmin):
     )
     def take_money(self, request: HttpRequest, object_id: int) -> str:
         # Check if object already exists, otherwise returs 404
-        obj = get_object_or_404(Compte, pk=object_id)
+        obj = get_compte(request, object_id)
         form = TransactionForm(request.POST or None)
 
         if request.method == "POST" and form.is_valid():
@@ -125,10 +318,8 @@ class CompteAdmin(ModelAdmin):
                 obj.take_money(amount)
             except ValueError as e:
                 messages.error(request, e)
-
-            obj.save()
-
-            messages.warning(request, _(f"Le compte a été débité de {amount}€"))
+            else:
+                messages.warning(request, _(f"Le compte a été débité de {amount}€"))
 
             return redirect(
                 reverse_lazy("admin:app_compte_change", args=[object_id])
@@ -136,13 +327,66 @@ class CompteAdmin(ModelAdmin):
 
         return self._display_transaction_form(request, form, obj)
 
-    def has_add_money_permission(self, request: HttpRequest, object_id: Union[int, str]) -> bool:
-        obj = get_object_or_404(Compte, pk=object_id)
-        return request.user == obj.manager
-
-    def has_take_money_permission(self, request: HttpRequest, object_id: Union[int, str]) -> bool:
-        obj = get_object_or_404(Compte, pk=object_id)
-        return request.user == obj.manager
+    @action(description=_("Créditer les comptes sélectionnés"), permissions=['add_money'])
+    def credit_selected(self, request: HttpRequest, queryset):
+        amount = self._bulk_amount(request)
+        if amount is not None:
+            self._bulk_apply(request, queryset, bulk.credit, _("{} compte(s) crédité(s) de {}€"), amount)
+
+    @action(description=_("Débiter les comptes sélectionnés"), permissions=['take_money'])
+    def debit_selected(self, request: HttpRequest, queryset):
+        amount = self._bulk_amount(request)
+        if amount is not None:
+            self._bulk_apply(request, queryset, bulk.debit, _("{} compte(s) débité(s) de {}€"), amount)
+
+    @action(description=_("Verser le salaire maintenant"), permissions=['add_money'])
+    def pay_salary_selected(self, request: HttpRequest, queryset):
+        self._bulk_apply(request, queryset, bulk.pay_salary, _("Salaire versé sur {} compte(s)"))
+
+    def _bulk_amount(self, request: HttpRequest):
+        form = TransactionForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, _("Indiquer un montant positif pour cette action."))
+            return None
+        return form.cleaned_data["amount"]
+
+    def _bulk_apply(self, request: HttpRequest, queryset, operation, message:str, *args):
+        """
+        Applique ``operation`` (voir ``app.bulk``) aux comptes sélectionnés que
+        l'utilisateur gère, et résume le résultat en un message par motif de refus.
+        """
+        managed = get_compte_access(request).managed
+        result = operation(queryset.filter(pk__in=managed), *args)
+        refused = list(queryset.exclude(pk__in=managed).values_list('name', flat=True))
+        if refused:
+            result.failed[_("Vous ne gérez pas ce compte")].extend(refused)
+        if result.done:
+            messages.success(request, message.format(len(result.done), *args))
+        for reason, names in result.failed.items():
+            shown = ", ".join(sorted(names)[:BULK_NAMES_SHOWN])
+            if len(names) > BULK_NAMES_SHOWN:
+                shown += _(" et {} autre(s)").format(len(names) - BULK_NAMES_SHOWN)
+            messages.error(request, _("{} : {} compte(s) ignoré(s) ({})").format(reason, len(names), shown))
+
+    def has_add_money_permission(self, request: HttpRequest, object_id: Union[int, str] = None) -> bool:
+        # Sans object_id (actions groupées) : l'utilisateur gère au moins un compte
+        if object_id is None:
+            return bool(get_compte_access(request).managed)
+        return get_compte_access(request).can_manage(object_id)
+
+    def has_take_money_permission(self, request: HttpRequest, object_id: Union[int, str] = None) -> bool:
+        if object_id is None:
+            return bool(get_compte_access(request).managed)
+        return get_compte_access(request).can_manage(object_id)
+
+    def has_compress_transactions_permission(self, request: HttpRequest, object_id: Union[int, str]) -> bool:
+        return get_compte_access(request).can_manage(object_id)
+
+    def has_export_transactions_permission(self, request: HttpRequest, object_id: Union[int, str]) -> bool:
+        return get_compte_access(request).can_view(object_id)
+
+    def has_view_performance_permission(self, request: HttpRequest) -> bool:
+        return request.user.is_superuser
 
 
     def get_list_filter(self, request):
@@ -154,14 +398,14 @@ class CompteAdmin(ModelAdmin):
     # Ne peut changer que si l'utilisateur est manager
         if obj is None:
              return False
-        return request.user == obj.manager
+        return get_compte_access(request).can_manage(obj.pk)
     
     def has_view_permission(self, request, obj:Compte = None):
         # Ne peut visionner que si possesseur ou manager d'un compte
         if obj is None:
-            return request.user.is_superuser or request.user.comptes.exists() or request.user.mon_compte.exists()
+            return request.user.is_superuser or bool(get_compte_access(request).visible)
         # Ne peut voir les détails du compte que si possesseur ou manager du compte
-        return request.user == obj.manager or request.user == obj.client
+        return get_compte_access(request).can_view(obj.pk)
 
     def has_module_permission(self, request):
         # Permet à tout utilisateur staff ou superuser de voir le module
@@ -177,7 +421,7 @@ class CompteAdmin(ModelAdmin):
     def get_queryset(self, request):
         query_set = super().get_queryset(request)
         if not request.user.is_superuser:
-            query_set = query_set.filter(Q(manager=request.user) | Q(client=request.user))
+            query_set = query_set.filter(pk__in=get_compte_access(request).visible)
         return query_set
     
 
@@ -185,11 +429,32 @@ class CompteAdmin(ModelAdmin):
 
 
 @admin.register(Transaction)
-class TransactionAdmin(ModelAdmin):
+class TransactionAdmin(FullTextSearchMixin, KeysetPaginationMixin, ModelAdmin):
     list_display = ('compte', 'amount', 'description', 'created_at')
-    search_fields = ['compte']
+    list_select_related = ('compte',)
+    search_fields = ['description', 'compte__name']
+    search_table = TRANSACTION_SEARCH
+    form = TransactionAdminForm
     list_filter = ['compte']
     list_per_page = 10
+    keyset = TRANSACTION_KEYSET
+
+    actions_list = ["export_csv", "export_jsonl"]
+
+    @action(description=_("Exporter (CSV)"), url_path="export-csv", icon="download", permissions=['view'])
+    def export_csv(self, request: HttpRequest):
+        # Toutes les transactions visibles par l'utilisateur, hors filtres de la liste
+        return export_response(self.get_queryset(request), 'csv', "transactions", archived=self.get_archived_queryset(request))
+
+    @action(description=_("Exporter (JSON Lines)"), url_path="export-jsonl", icon="download", permissions=['view'])
+    def export_jsonl(self, request: HttpRequest):
+        return export_response(self.get_queryset(request), 'jsonl', "transactions", archived=self.get_archived_queryset(request))
+
+    def get_archived_queryset(self, request):
+        query_set = ArchivedTransaction.objects.all()
+        if not request.user.is_superuser:
+            query_set = query_set.filter(compte_id__in=get_compte_access(request).visible)
+        return query_set
 
     def get_list_filter(self, request):
         # On affiche les filtres uniquement pour le superutilisateur
@@ -198,25 +463,41 @@ class TransactionAdmin(ModelAdmin):
     def get_queryset(self, request):
         query_set = super().get_queryset(request)
         if not request.user.is_superuser:
-            query_set = query_set.filter(Q(compte__manager=request.user) | Q(compte__client=request.user))
+            query_set = query_set.filter(compte_id__in=get_compte_access(request).visible)
         return query_set
 
     def has_view_permission(self, request, obj:Transaction = None):
         # Ne peut visionner que si possesseur ou manager d'un compte
         if obj is None:
-            return request.user.is_superuser or request.user.comptes.exists() or request.user.mon_compte.exists()
+            return request.user.is_superuser or bool(get_compte_access(request).visible)
         # Ne peut voir les détails du compte que si possesseur ou manager du compte
-        return request.user == obj.compte.manager or request.user == obj.compte.client
+        return get_compte_access(request).can_view(obj.compte_id)
 
     def has_module_permission(self, request):
         # Peut accéder au module uniquement si a un compte ou est manager d'un compte
-        if not hasattr(request.user, 'comptes'):
+        if not request.user.is_authenticated:
             return False
-        return request.user.is_superuser or request.user.comptes.exists() or request.user.mon_compte.exists()
+        return request.user.is_superuser or bool(get_compte_access(request).visible)
 
     def has_delete_permission(self, request, obj=None):
         return False
 
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ValueError as e:
+            # Débit concurrent entre la validation du formulaire et l'écriture :
+            # rien n'a été enregistré, on revient au formulaire
+            if request.method != 'POST':
+                raise
+            messages.error(request, e)
+            return redirect(request.get_full_path())
+
+    def save_model(self, request, obj, form, change):
+        # Une transaction créée depuis l'admin doit aussi mettre à jour le solde du compte
+        with atomic():
+            super().save_model(request, obj, form, change)
+            obj.compte._apply_delta(obj.amount, obj.created_at, require_funds=obj.amount < 0)
 
     def has_change_permission(self, request, obj=None):
         # Une transaction ne peut pas être modifiée
@@ -0,0 +1,159 @@
+"""
+API JSON en lecture seule, pour les clients qui interrogent régulièrement un
+compte (widget de téléphone, ...).
+
+Chaque réponse porte un ETag calculé à partir des seules lignes des comptes
+(``Compte.version`` est incrémentée à chaque écriture de transaction) : une
+requête ``If-None-Match`` à jour reçoit un ``304`` sans lire la table des
+transactions.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from app import cache as summary_cache
+from app.models import Compte, Transaction
+from app.pagination import TRANSACTION_KEYSET, after_cursor, decode_cursor, encode_cursor
+from app.permissions import get_compte_access
+
+SUMMARY_FIELDS = ('id', 'name', 'balance', 'salary', 'last_salary_payment', 'next_salary_payment', 'version')
+
+TRANSACTIONS_PER_PAGE = 20
+
+COMPTES_PER_PAGE = 100
+COMPTE_KEYSET = ('id',)
+
+
+def api_login_required(view):
+    """
+    Comme ``login_required``, mais répond ``401`` au lieu de rediriger vers la page de connexion.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': "Authentification requise."}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def comptes_cursor(request):
+    """
+    Identifiant du dernier compte de la page précédente (``?cursor=``), ``0``
+    pour la première page, ``None`` si le curseur est invalide.
+    """
+    if 'cursor' not in request.GET:
+        return 0
+    cursor = decode_cursor(request.GET['cursor'], Compte, COMPTE_KEYSET)
+    return cursor[0] if cursor else None
+
+
+def get_summaries(request, compte_id=None) -> list:
+    """
+    Résumés des comptes visibles par l'utilisateur (ou du seul ``compte_id``),
+    avec les mêmes règles que ``CompteAdmin.get_queryset``. Lus une seule fois
+    par requête (pour l'ETag, puis pour la réponse), depuis le cache partagé.
+
+    Sans ``compte_id``, seule la page ``?cursor=`` de ``COMPTES_PER_PAGE``
+    comptes est lue ; le curseur de la page suivante est dans
+    ``request._api_next_cursor``.
+    """
+    summaries = getattr(request, '_api_summaries', None)
+    if summaries is None:
+        if compte_id is not None:
+            if not (request.user.is_superuser or get_compte_access(request).can_view(compte_id)):
+                raise Http404
+            ids = [compte_id]
+        else:
+            after = comptes_cursor(request)
+            if request.user.is_superuser:
+                ids = list(Compte.objects.filter(pk__gt=after).order_by('pk').values_list('pk', flat=True)[:COMPTES_PER_PAGE + 1])
+            else:
+                ids = sorted(pk for pk in get_compte_access(request).visible if pk > after)[:COMPTES_PER_PAGE + 1]
+            request._api_next_cursor = None
+            if len(ids) > COMPTES_PER_PAGE:
+                ids = ids[:COMPTES_PER_PAGE]
+                request._api_next_cursor = str(ids[-1])
+        found = summary_cache.get_summaries(ids, load_summaries)
+        summaries = request._api_summaries = [found[pk] for pk in sorted(found)]
+        if compte_id is not None and not summaries:
+            raise Http404
+    return summaries
+
+
+def load_summaries(compte_ids) -> dict:
+    return {row['id']: row for row in Compte.objects.filter(pk__in=compte_ids).values(*SUMMARY_FIELDS)}
+
+
+def summaries_etag(request, compte_id=None):
+    if compte_id is None and comptes_cursor(request) is None:
+        # Curseur invalide : la vue répond 400
+        return None
+    state = repr([tuple(summary.values()) for summary in get_summaries(request, compte_id)])
+    # Une autre page de l'historique est une autre représentation
+    state += request.GET.get('cursor', '')
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def api_view(view):
+    """
+    Décorateurs communs des vues de l'API : GET/HEAD uniquement, authentification,
+    revalidation systématique par le client et réponse ``304`` si l'ETag n'a pas changé.
+    """
+    return require_safe(api_login_required(cache_control(private=True, no_cache=True)(
+        condition(etag_func=summaries_etag)(view)
+    )))
+
+
+@require_safe
+@api_login_required
+def cache_stats(request):
+    if not request.user.is_superuser:
+        raise Http404
+    return JsonResponse(summary_cache.stats())
+
+
+@api_view
+def comptes(request):
+    """
+    Comptes visibles, ``COMPTES_PER_PAGE`` par page par ordre d'identifiant ; la
+    page suivante s'obtient avec ``?cursor=<next_cursor>``.
+    """
+    if comptes_cursor(request) is None:
+        return JsonResponse({'detail': "Curseur invalide."}, status=400)
+    summaries = get_summaries(request)
+    return JsonResponse({'comptes': summaries, 'next_cursor': request._api_next_cursor})
+
+
+@api_view
+def compte(request, compte_id:int):
+    return JsonResponse(get_summaries(request, compte_id)[0])
+
+
+@api_view
+def compte_transactions(request, compte_id:int):
+    """
+    Dernières transactions du compte, ``TRANSACTIONS_PER_PAGE`` par page ; la page
+    suivante s'obtient avec ``?cursor=<next_cursor>``.
+    """
+    get_summaries(request, compte_id)
+    transactions = Transaction.objects.filter(compte_id=compte_id).order_by(*TRANSACTION_KEYSET)
+    if 'cursor' in request.GET:
+        cursor = decode_cursor(request.GET['cursor'], Transaction)
+        if cursor is None:
+            return JsonResponse({'detail': "Curseur invalide."}, status=400)
+        transactions = after_cursor(transactions, cursor)
+    page = list(transactions.only('id', 'created_at', 'amount', 'description')[:TRANSACTIONS_PER_PAGE + 1])
+    next_cursor = None
+    if len(page) > TRANSACTIONS_PER_PAGE:
+        page = page[:TRANSACTIONS_PER_PAGE]
+        next_cursor = encode_cursor(page[-1])
+    return JsonResponse({
+        'transactions': [
+            {'id': t.pk, 'created_at': t.created_at, 'amount': t.amount, 'description': t.description}
+            for t in page
+        ],
+        'next_cursor': next_cursor,
+    })
@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks des opérations du grand livre.
+
+Chaque cas est chronométré ``repeat`` fois sur le compte le plus actif des
+données générées par ``app.seeding.seed_ledger``, avec le nombre de requêtes
+SQL exécutées. Les cas qui écrivent tournent dans une transaction annulée à
+chaque répétition : toutes les mesures portent sur les mêmes données.
+
+Voir la commande ``bench_ledger``, qui crée une base jetable par taille.
+"""
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.transaction import atomic
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Compte
+from app.seeding import seed_ledger
+
+
+class BenchContext:
+    """
+    Ce dont les cas ont besoin : le compte mesuré, son manager connecté au
+    client de test et la date de fin des données.
+    """
+
+    def __init__(self, compte:Compte, until):
+        self.compte = compte
+        self.until = until
+        self.client = Client()
+        self.client.force_login(compte.manager)
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise AssertionError(f"{url} : HTTP {response.status_code}")
+
+
+CASES = {
+    'compte_total': lambda ctx: Compte.objects.get(pk=ctx.compte.pk).total,
+    'balance_at': lambda ctx: ctx.compte.balance_at(ctx.until - timedelta(days=30)),
+    'add_money': lambda ctx: ctx.compte.add_money(Decimal('1.00'), description='Bench'),
+    'take_money': lambda ctx: ctx.compte.take_money(Decimal('0.01'), description='Bench'),
+    'compress_transactions': lambda ctx: ctx.compte.compress_transactions(ctx.until - timedelta(days=30)),
+    'pay_salary_if_due': lambda ctx: ctx.compte.pay_salary_if_due(now=ctx.until + timedelta(days=1)),
+    'admin_compte_changelist': lambda ctx: _get(ctx.client, reverse('admin:app_compte_changelist')),
+    'admin_compte_change': lambda ctx: _get(ctx.client, reverse('admin:app_compte_change', args=[ctx.compte.pk])),
+    'admin_transaction_changelist': lambda ctx: _get(ctx.client, reverse('admin:app_transaction_changelist')),
+}
+
+
+def measure(case, ctx:BenchContext, repeat:int) -> dict:
+    """
+    Chronomètre ``case(ctx)`` ``repeat`` fois, après un passage à vide qui remplit les caches.
+
+    Returns
+    -------
+    Un dictionnaire avec les durées (médiane, minimum, maximum, en millisecondes)
+    et le nombre de requêtes SQL du dernier passage.
+    """
+    timings = []
+    for run in range(repeat + 1):
+        ctx.compte.refresh_from_db()
+        with atomic():
+            with CaptureQueriesContext(connections['default']) as queries:
+                started = time.perf_counter()
+                case(ctx)
+                elapsed = time.perf_counter() - started
+            # Les écritures sont annulées, la répétition suivante retrouve les mêmes données
+            transaction.set_rollback(True)
+        if run:
+            timings.append(elapsed * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': len(queries),
+    }
+
+
+def run_benchmarks(users:int, comptes:int, transactions:int, seed:int = 0, repeat:int = 20, cases=None) -> list:
+    """
+    Génère les données puis mesure les cas ``cases`` (tous par défaut) sur la base courante.
+
+    Returns
+    -------
+    Une liste de résultats, un dictionnaire par cas.
+    """
+    until = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    compte_ids = seed_ledger(users, comptes, transactions, seed=seed, until=until, prefix=f'bench{seed}-')
+    compte = Compte.objects.select_related('manager').get(pk=compte_ids[0])
+    ctx = BenchContext(compte, until)
+    size = {'users': users, 'comptes': comptes, 'transactions': transactions, 'compte_transactions': compte.transactions.count()}
+    results = []
+    for name in cases or CASES:
+        results.append({'case': name, **size, **measure(CASES[name], ctx, repeat)})
+    return results
@@ -0,0 +1,134 @@
+"""
+Opérations groupées sur plusieurs comptes (actions de la liste des comptes).
+
+Chaque opération s'applique à tous les comptes sélectionnés dans une seule
+transaction de base de données : un UPDATE pour les soldes, une insertion
+groupée des transactions, puis la mise à jour groupée des relevés et des
+cumuls hebdomadaires. Le nombre de requêtes ne dépend pas du nombre de comptes.
+Les comptes refusés (solde insuffisant, pas de salaire) sont regroupés par
+motif dans le résultat, sans annuler l'opération pour les autres.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import OperationalError
+from django.db.models import F
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from app.cache import invalidate_comptes
+from app.fields import money
+from app.models import BalanceSnapshot, Compte, Transaction, WeeklyRollup
+from app.payroll import SALARY_PERIOD
+
+
+class BulkConflict(Exception):
+    """
+    Un solde a changé entre la lecture des comptes et leur débit.
+    """
+
+
+@dataclass
+class BulkResult:
+    # Comptes traités
+    done: list = field(default_factory=list)
+    # Noms des comptes refusés, par motif
+    failed: dict = field(default_factory=lambda: defaultdict(list))
+
+
+def credit(queryset, amount:Decimal, description:str = None) -> BulkResult:
+    """
+    Crédite ``amount`` sur chaque compte de ``queryset``.
+    """
+    result = BulkResult(done=list(queryset.select_related(None).only('pk', 'name')))
+    with atomic():
+        _write(result.done, amount, description)
+    return result
+
+
+def debit(queryset, amount:Decimal, description:str = None, max_retries:int = 5) -> BulkResult:
+    """
+    Débite ``amount`` de chaque compte de ``queryset`` dont le solde suffit.
+    """
+    retries = 0
+    while True:
+        try:
+            with atomic():
+                return _debit(queryset, amount, description)
+        except (BulkConflict, OperationalError):
+            # Débit concurrent ou base verrouillée : la transaction a été annulée, on relit les soldes
+            retries += 1
+            if retries > max_retries:
+                raise
+
+
+def _debit(queryset, amount:Decimal, description:str) -> BulkResult:
+    result = BulkResult()
+    for compte in queryset.select_related(None).only('pk', 'name', 'balance'):
+        if compte.balance >= amount:
+            result.done.append(compte)
+        else:
+            result.failed[_('Vous ne pouvez pas prélever plus que le total du compte')].append(compte.name)
+    # Comme take_money, le débit est conditionné au solde en base dans le même UPDATE
+    updated = _write(result.done, -amount, description, Compte.objects.filter(balance__gte=amount))
+    if updated != len(result.done):
+        raise BulkConflict()
+    return result
+
+
+def pay_salary(queryset) -> BulkResult:
+    """
+    Verse dès maintenant la prochaine échéance du salaire de chaque compte de
+    ``queryset`` : l'échéancier avance d'une semaine, le salaire n'est pas
+    versé une seconde fois à la date prévue (voir ``app.payroll``).
+    """
+    result = BulkResult()
+    now = timezone.now()
+    with atomic():
+        for compte in queryset.select_related(None).only('pk', 'name', 'salary'):
+            if compte.salary > 0:
+                result.done.append(compte)
+            else:
+                result.failed[_("Pas de salaire sur ce compte")].append(compte.name)
+        if not result.done:
+            return result
+        ids = [compte.pk for compte in result.done]
+        Compte.objects.filter(pk__in=ids).update(
+            balance=F('balance') + F('salary'),
+            version=F('version') + 1,
+            last_salary_payment=F('next_salary_payment'),
+            next_salary_payment=F('next_salary_payment') + SALARY_PERIOD,
+        )
+        invalidate_comptes(ids)
+        # Relu après l'UPDATE, dans la même transaction : le montant est celui qui a été versé
+        salaries = Compte.objects.filter(pk__in=ids).values_list('pk', 'salary')
+        _record([
+            Transaction(compte_id=pk, amount=salary, description=_('Weekly salary payment'), created_at=now)
+            for pk, salary in salaries
+        ])
+    return result
+
+
+def _write(comptes, amount:Decimal, description:str, queryset=None) -> int:
+    """
+    Répercute ``amount`` sur le solde de ``comptes`` et écrit leurs transactions.
+    Renvoie le nombre de comptes modifiés par l'UPDATE.
+    """
+    if not comptes:
+        return 0
+    ids = [compte.pk for compte in comptes]
+    queryset = Compte.objects.all() if queryset is None else queryset
+    updated = queryset.filter(pk__in=ids).update(balance=F('balance') + money(amount), version=F('version') + 1)
+    invalidate_comptes(ids)
+    now = timezone.now()
+    _record([Transaction(compte_id=pk, amount=amount, description=description, created_at=now) for pk in ids])
+    return updated
+
+
+def _record(transactions):
+    Transaction.objects.bulk_create(transactions)
+    entries = [(t.compte_id, t.created_at, t.amount) for t in transactions]
+    BalanceSnapshot.objects.record(entries)
+    WeeklyRollup.objects.record(entries)
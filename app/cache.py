@@ -0,0 +1,121 @@
+"""
+Cache partagé des résumés de comptes et des droits d'accès.
+
+Les valeurs sont lues dans le cache ``default`` (voir ``CACHES`` dans les
+settings) et rechargées depuis la base à l'expiration (``SUMMARY_TIMEOUT``) ou
+après une écriture : chaque chemin d'écriture appelle ``invalidate_comptes``,
+qui supprime les résumés concernés immédiatement et à nouveau après le commit
+(un lecteur a pu remettre l'ancienne valeur en cache entre les deux). Le
+nouveau solde est alors aussi publié aux écrans abonnés (voir ``app.events``).
+
+Incrémenter ``KEY_VERSION`` quand le format des valeurs en cache change.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from app.events import publish_balances
+
+KEY_VERSION = 1
+SUMMARY_TIMEOUT = 300
+ACCESS_TIMEOUT = 300
+
+ACCESS_GENERATION = 'access:generation'
+
+
+def summary_key(compte_id) -> str:
+    return f'compte:{compte_id}:summary'
+
+
+def _count(name:str, delta:int):
+    if not delta:
+        return
+    key = f'stats:{name}'
+    try:
+        cache.incr(key, delta, version=KEY_VERSION)
+    except ValueError:
+        cache.add(key, delta, timeout=None, version=KEY_VERSION)
+
+
+def stats() -> dict:
+    """
+    Compteurs de succès (``hits``) et d'échecs (``misses``) du cache.
+    """
+    values = cache.get_many(['stats:hits', 'stats:misses'], version=KEY_VERSION)
+    return {'hits': values.get('stats:hits', 0), 'misses': values.get('stats:misses', 0)}
+
+
+def reset_stats():
+    cache.delete_many(['stats:hits', 'stats:misses'], version=KEY_VERSION)
+
+
+def get_summaries(compte_ids, loader) -> dict:
+    """
+    Résumés des comptes ``compte_ids``, lus dans le cache ou chargés par ``loader``.
+
+    Parameters
+    ----------
+    compte_ids: iterable
+        Identifiants des comptes.
+    loader: callable
+        Reçoit la liste des identifiants absents du cache et renvoie un
+        dictionnaire ``{identifiant: résumé}`` (les comptes inexistants en sont absents).
+
+    Returns
+    -------
+    Un dictionnaire ``{identifiant: résumé}``.
+    """
+    keys = {summary_key(pk): pk for pk in compte_ids}
+    cached = cache.get_many(list(keys), version=KEY_VERSION)
+    summaries = {keys[key]: value for key, value in cached.items()}
+    missing = [pk for pk in keys.values() if pk not in summaries]
+    _count('hits', len(summaries))
+    _count('misses', len(missing))
+    if missing:
+        loaded = loader(missing)
+        cache.set_many({summary_key(pk): value for pk, value in loaded.items()}, SUMMARY_TIMEOUT, version=KEY_VERSION)
+        summaries.update(loaded)
+    return summaries
+
+
+def invalidate_comptes(compte_ids):
+    """
+    Oublie les résumés des comptes ``compte_ids``, à appeler dans la transaction qui les modifie.
+    """
+    compte_ids = list(compte_ids)
+    if not compte_ids:
+        return
+    keys = [summary_key(pk) for pk in compte_ids]
+    cache.delete_many(keys, version=KEY_VERSION)
+
+    def after_commit():
+        cache.delete_many(keys, version=KEY_VERSION)
+        publish_balances(compte_ids)
+    transaction.on_commit(after_commit)
+
+
+def get_access(user_id, loader):
+    """
+    Droits d'accès de l'utilisateur ``user_id``, lus dans le cache ou calculés par ``loader()``.
+    """
+    generation = cache.get(ACCESS_GENERATION, 0, version=KEY_VERSION)
+    key = f'access:{generation}:{user_id}'
+    access = cache.get(key, version=KEY_VERSION)
+    _count('hits' if access is not None else 'misses', 1)
+    if access is None:
+        access = loader()
+        cache.set(key, access, ACCESS_TIMEOUT, version=KEY_VERSION)
+    return access
+
+
+def invalidate_access():
+    """
+    Oublie les droits d'accès de tous les utilisateurs (création d'un compte,
+    changement de manager ou de titulaire, ...).
+    """
+    def bump():
+        try:
+            cache.incr(ACCESS_GENERATION, version=KEY_VERSION)
+        except ValueError:
+            cache.add(ACCESS_GENERATION, 1, timeout=None, version=KEY_VERSION)
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,157 @@
+"""
+Compaction des transactions par lots.
+
+Les transactions antérieures à une date sont reportées, lot par lot, sur une
+transaction "Situation au ..." puis supprimées. Chaque lot est traité dans sa
+propre transaction de base de données, qui met aussi à jour le point de reprise
+(``CompactionCheckpoint``) : un traitement interrompu reprend là où il s'était
+arrêté, et SQLite n'est jamais verrouillé longtemps.
+
+Avec archivage, les transactions compactées sont déplacées à l'identique dans
+``ArchivedTransaction`` au lieu d'être perdues : le grand livre reste petit
+(un report par compte), l'historique complet reste lisible par ``balance_at``,
+``balance_series`` et les exports. Un compte archivé l'est à chaque compaction
+suivante, sinon un report non archivé compterait une seconde fois les montants
+déjà archivés.
+"""
+import time as clock
+from datetime import datetime, time
+
+from django.db import OperationalError
+from django.db.models import Count, F
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from app.cache import invalidate_comptes
+from app.fields import money
+from app.models import ArchivedTransaction, BalanceSnapshot, CompactionCheckpoint, Compte, Transaction
+
+
+def as_cutoff(value) -> datetime:
+    """
+    Convertit une date (fin de journée) ou une date naïve en date avec fuseau horaire.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.max)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def compact_compte(compte_id:int, before:datetime, chunk_size:int = 1000, max_retries:int = 10, archive:bool = False) -> int:
+    """
+    Compacte les transactions d'un compte antérieures ou égales à ``before``.
+
+    Parameters
+    ----------
+    archive: bool
+        Déplace les transactions compactées dans les archives. Toujours vrai
+        pour un compte déjà archivé.
+
+    Returns
+    -------
+    Le nombre de transactions retirées du grand livre par cet appel.
+    """
+    before = as_cutoff(before)
+    archive = archive or CompactionCheckpoint.objects.filter(compte_id=compte_id, archived=True).exists()
+    # Une compaction reprise garde le mode de son premier lancement
+    checkpoint, _ = CompactionCheckpoint.objects.get_or_create(compte_id=compte_id, cutoff=before, defaults={'archived': archive})
+    if checkpoint.completed_at:
+        return 0
+
+    if checkpoint.carry_id is None:
+        with atomic():
+            carry = Transaction.objects.create(
+                compte_id=compte_id,
+                amount=0,
+                created_at=before,
+                description=f"Situation au {timezone.localtime(before).strftime('%d/%m/%Y')}",
+            )
+            checkpoint.carry = carry
+            checkpoint.save(update_fields=['carry'])
+            Compte.objects.filter(pk=compte_id).update(version=F('version') + 1)
+            invalidate_comptes([compte_id])
+
+    removed = 0
+    retries = 0
+    while True:
+        try:
+            count = _compact_chunk(checkpoint, chunk_size)
+        except OperationalError:
+            # Base verrouillée par un autre processus : le lot a été annulé, on le rejoue
+            retries += 1
+            if retries > max_retries:
+                raise
+            clock.sleep(0.05 * retries)
+            continue
+        if not count:
+            return removed
+        removed += count
+        retries = 0
+
+
+def _compact_chunk(checkpoint:CompactionCheckpoint, chunk_size:int) -> int:
+    with atomic():
+        rows = list(
+            Transaction.objects.filter(compte_id=checkpoint.compte_id, created_at__lte=checkpoint.cutoff)
+            .exclude(pk=checkpoint.carry_id)
+            .order_by('created_at', 'id')
+            .values_list('pk', 'amount', 'created_at', 'description')[:chunk_size]
+        )
+        if not rows:
+            CompactionCheckpoint.objects.filter(pk=checkpoint.pk).update(completed_at=timezone.now())
+            return 0
+        ids = [row[0] for row in rows]
+        Transaction.objects.filter(pk=checkpoint.carry_id).update(amount=F('amount') + money(sum(row[1] for row in rows)))
+        if checkpoint.archived:
+            # Les reports des archivages précédents résument des transactions déjà archivées
+            carries = set(
+                CompactionCheckpoint.objects.filter(compte_id=checkpoint.compte_id, archived=True, carry_id__in=ids)
+                .values_list('carry_id', flat=True)
+            )
+            ArchivedTransaction.objects.bulk_create([
+                ArchivedTransaction(id=pk, compte_id=checkpoint.compte_id, amount=amount, created_at=created_at, description=description)
+                for pk, amount, created_at, description in rows if pk not in carries
+            ])
+        Transaction.objects.filter(pk__in=ids).delete()
+        # Les relevés antérieurs à la date limite ne correspondent plus au grand livre
+        BalanceSnapshot.objects.filter(compte_id=checkpoint.compte_id, period_end__lte=checkpoint.cutoff).delete()
+        # Les cumuls hebdomadaires (WeeklyRollup) restent : les mouvements compactés ont bien eu lieu.
+        # Les relevés (BalanceSnapshot) aussi seraient justes avec archivage, mais
+        # balance_at compterait le report en plus des relevés qui l'incluent déjà
+        CompactionCheckpoint.objects.filter(pk=checkpoint.pk).update(compacted=F('compacted') + len(ids))
+        Compte.objects.filter(pk=checkpoint.compte_id).update(version=F('version') + 1)
+        invalidate_comptes([checkpoint.compte_id])
+    return len(ids)
+
+
+def comptes_to_compact(before:datetime):
+    """
+    Identifiants des comptes ayant plus d'une transaction antérieure à ``before``.
+    """
+    return (
+        Transaction.objects.filter(created_at__lte=as_cutoff(before))
+        .values('compte_id')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('compte_id', flat=True)
+    )
+
+
+def compact_all(before:datetime, workers:int = 1, chunk_size:int = 1000, archive:bool = False) -> int:
+    """
+    Compacte tous les comptes, en répartissant les comptes sur ``workers`` processus.
+
+    Returns
+    -------
+    Le nombre total de transactions retirées du grand livre.
+    """
+    before = as_cutoff(before)
+    compte_ids = list(comptes_to_compact(before))
+    if workers <= 1:
+        return sum(compact_compte(compte_id, before, chunk_size, archive=archive) for compte_id in compte_ids)
+    # Import tardif : concurrent.futures n'est chargé que si plusieurs processus sont demandés
+    from app.workers import map_in_processes
+    return sum(map_in_processes(
+        'app.compaction.compact_compte', compte_ids, workers, before=before, chunk_size=chunk_size, archive=archive,
+    ))
@@ -0,0 +1,72 @@
+"""
+Tableau de bord hebdomadaire des familles : entrées et sorties d'argent de
+chaque enfant sur les dernières semaines.
+
+Tout est lu dans ``WeeklyRollup`` (une ligne par compte et par semaine), jamais
+dans le grand livre : quelques centaines de lignes par page.
+"""
+import json
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from app.models import WeeklyRollup, week_start
+
+WEEKS = 12
+# Nombre maximal de comptes affichés (superutilisateur)
+MAX_COMPTES = 200
+CHART_OPTIONS = json.dumps({
+    'plugins': {'legend': {'display': False}},
+    'scales': {'x': {'stacked': True}, 'y': {'stacked': True}},
+})
+COLORS = ['--color-primary-700', '--color-primary-500', '--color-primary-300', '--color-base-500', '--color-base-300']
+
+
+def family_dashboards(comptes, weeks:int = WEEKS) -> list:
+    """
+    Données des graphiques, une entrée par famille (comptes d'un même manager).
+
+    Parameters
+    ----------
+    comptes: QuerySet
+        Comptes visibles par l'utilisateur.
+    weeks: int
+        Nombre de semaines affichées, celle en cours comprise.
+
+    Returns
+    -------
+    Une liste de dictionnaires ``manager``, ``comptes`` (totaux de la période
+    par enfant) et ``chart`` (données Chart.js en JSON), triée par manager.
+    """
+    comptes = list(comptes.select_related('manager').order_by('manager__username', 'name')[:MAX_COMPTES])
+    labels = [week_start(timezone.now()) - timedelta(days=7 * n) for n in reversed(range(weeks))]
+    rollups = defaultdict(dict)
+    for compte_id, week, credit, debit in (
+        WeeklyRollup.objects.filter(compte__in=comptes, week__gte=labels[0]).values_list('compte_id', 'week', 'credit', 'debit')
+    ):
+        rollups[compte_id][week] = (credit, debit)
+
+    families = defaultdict(list)
+    for compte in comptes:
+        families[compte.manager].append(compte)
+
+    dashboards = []
+    for manager, members in families.items():
+        datasets = []
+        totals = []
+        for i, compte in enumerate(members):
+            weekly = [rollups[compte.pk].get(week, (Decimal(0), Decimal(0))) for week in labels]
+            color = f'var({COLORS[i % len(COLORS)]})'
+            # Entrées au-dessus de l'axe, sorties en dessous, une colonne par enfant
+            datasets.append({'label': f'{compte.name} (entrées)', 'stack': str(compte.pk), 'backgroundColor': color, 'data': [float(credit) for credit, _ in weekly]})
+            datasets.append({'label': f'{compte.name} (sorties)', 'stack': str(compte.pk), 'backgroundColor': color, 'data': [-float(debit) for _, debit in weekly]})
+            totals.append({
+                'compte': compte,
+                'credit': sum(credit for credit, _ in weekly),
+                'debit': sum(debit for _, debit in weekly),
+            })
+        chart = {'labels': [week.strftime('%d/%m') for week in labels], 'datasets': datasets}
+        dashboards.append({'manager': manager, 'comptes': totals, 'chart': json.dumps(chart)})
+    return dashboards
@@ -0,0 +1,203 @@
+"""
+Diffusion des nouveaux soldes aux écrans ouverts (voir ``app.live``).
+
+Après chaque écriture validée, ``publish_balances`` publie le solde des comptes
+modifiés sur le canal ``compte:<id>`` du broker configuré par
+``settings.EVENTS_BROKER`` :
+
+- ``InProcessBroker`` (par défaut) : abonnés du même processus uniquement ;
+- ``CacheBroker`` : passe par le cache partagé (cache fichier, voir ``CACHES``),
+  pour plusieurs processus sur une même machine, en attendant un vrai broker.
+"""
+import asyncio
+import functools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'app.events.InProcessBroker'
+
+
+def channel(compte_id) -> str:
+    return f'compte:{compte_id}'
+
+
+class InProcessSubscription:
+
+    def __init__(self, broker, channel:str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def next(self, timeout:float):
+        """
+        Prochain message du canal, ou ``None`` si rien n'arrive avant ``timeout`` secondes.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Pub/sub en mémoire : ``publish`` peut être appelé depuis n'importe quel thread,
+    chaque abonné reçoit le message dans sa boucle d'événements.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel:str) -> InProcessSubscription:
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    async def asubscribe(self, channel:str) -> InProcessSubscription:
+        return self.subscribe(channel)
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.channel, None)
+
+    def wants(self, channel:str) -> bool:
+        return bool(self._subscriptions.get(channel))
+
+    def wanted(self, channels) -> set:
+        """
+        Canaux de ``channels`` qui ont des abonnés.
+        """
+        return {channel for channel in channels if self.wants(channel)}
+
+    def channels(self) -> list:
+        with self._lock:
+            return list(self._subscriptions)
+
+    def publish(self, channel:str, message:str):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+            except RuntimeError:
+                # Boucle fermée : l'abonné est parti sans se désinscrire
+                self._unsubscribe(subscription)
+
+
+class CacheBroker:
+    """
+    Broker de remplacement qui passe par le cache partagé.
+
+    Un seul poller par processus interroge le cache toutes les ``poll_interval``
+    secondes pour tous les canaux suivis dans le processus, et transmet les
+    nouveaux messages aux abonnés locaux (un ``InProcessBroker``). Chaque
+    processus signale dans le cache les canaux qu'il suit : ``publish_balances``
+    ne publie que pour les canaux qui ont un abonné quelque part.
+    """
+    poll_interval = 0.5
+    # Durée de vie de la marque "canal suivi", rafraîchie par le poller
+    listen_timeout = 30
+    message_timeout = 60
+
+    def __init__(self):
+        self._local = InProcessBroker()
+        # Dernier message transmis, par canal suivi
+        self._seen = {}
+        self._poller = None
+
+    @staticmethod
+    def _seq_key(channel:str) -> str:
+        return f'events:{channel}:seq'
+
+    @staticmethod
+    def _listening_key(channel:str) -> str:
+        return f'events:{channel}:listening'
+
+    async def asubscribe(self, channel:str) -> InProcessSubscription:
+        if not self._local.wants(channel):
+            # Marque posée avant la lecture du numéro : toute publication
+            # postérieure est vue par le poller
+            await cache.aset(self._listening_key(channel), True, self.listen_timeout)
+            self._seen[channel] = await cache.aget(self._seq_key(channel), 0)
+        subscription = self._local.subscribe(channel)
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not subscription.loop:
+            self._poller = subscription.loop.create_task(self._poll())
+        return subscription
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        refreshed = loop.time()
+        while True:
+            channels = self._local.channels()
+            for channel in set(self._seen) - set(channels):
+                del self._seen[channel]
+            if not channels:
+                # Pas d'attente entre ce test et la fin : un nouvel abonné relance un poller
+                self._poller = None
+                return
+            seqs = await cache.aget_many([self._seq_key(channel) for channel in channels])
+            pending = {}
+            for channel in channels:
+                seq = seqs.get(self._seq_key(channel), 0)
+                if channel in self._seen and seq > self._seen[channel]:
+                    # Seul le dernier solde compte : on saute les messages intermédiaires
+                    self._seen[channel] = seq
+                    pending[f'events:{channel}:{seq}'] = channel
+            if pending:
+                for key, message in (await cache.aget_many(list(pending))).items():
+                    self._local.publish(pending[key], message)
+            if loop.time() - refreshed >= self.listen_timeout / 3:
+                refreshed = loop.time()
+                await cache.aset_many({self._listening_key(channel): True for channel in channels}, self.listen_timeout)
+            await asyncio.sleep(self.poll_interval)
+
+    def wants(self, channel:str) -> bool:
+        return bool(self.wanted([channel]))
+
+    def wanted(self, channels) -> set:
+        keys = {self._listening_key(channel): channel for channel in channels}
+        return {keys[key] for key in cache.get_many(list(keys))}
+
+    def publish(self, channel:str, message:str):
+        key = self._seq_key(channel)
+        try:
+            seq = cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            seq = cache.incr(key)
+        cache.set(f'events:{channel}:{seq}', message, self.message_timeout)
+
+
+@functools.cache
+def get_broker():
+    return import_string(getattr(settings, 'EVENTS_BROKER', DEFAULT_BROKER))()
+
+
+def publish_balances(compte_ids):
+    """
+    Publie le solde actuel des comptes ``compte_ids`` qui ont des abonnés.
+    À appeler une fois l'écriture validée.
+    """
+    from app.models import Compte
+
+    broker = get_broker()
+    channels = {channel(pk): pk for pk in compte_ids}
+    wanted = [channels[name] for name in broker.wanted(channels)]
+    if not wanted:
+        return
+    for row in Compte.objects.filter(pk__in=wanted).values('id', 'balance', 'version'):
+        broker.publish(channel(row['id']), json.dumps(row, cls=DjangoJSONEncoder))
@@ -0,0 +1,131 @@
+"""
+Export et import des transactions en CSV ou JSON Lines.
+
+L'export est un flux : les lignes sont lues par paquets (``iterator``) et
+écrites au fur et à mesure dans la réponse, la mémoire utilisée ne dépend pas
+du nombre de transactions. L'import (voir la commande ``import_transactions``)
+relit le même format.
+
+Les transactions archivées par une compaction (voir ``app.compaction``) sont
+exportées à la place de leurs reports "Situation au ...".
+"""
+import csv
+import heapq
+import json
+
+from django.http import Http404, StreamingHttpResponse
+
+from app.models import CompactionCheckpoint
+
+# Colonnes exportées, dans l'ordre, et attendues à l'import
+EXPORT_FIELDS = ('compte', 'created_at', 'amount', 'description')
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    Pseudo-fichier qui renvoie ce qu'on lui écrit, pour que ``csv.writer``
+    produise des chaînes au lieu d'écrire dans un tampon.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _ledger_rows(queryset):
+    return (
+        queryset.order_by('compte_id', 'created_at', 'id')
+        .values_list('compte_id', 'created_at', 'id', 'amount', 'description')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def export_rows(queryset, archived=None):
+    """
+    Transactions de ``queryset`` sous forme de dictionnaires sérialisables,
+    dans l'ordre de l'index ``(compte, created_at)``.
+
+    Parameters
+    ----------
+    queryset: QuerySet
+        Transactions du grand livre.
+    archived: QuerySet
+        Transactions archivées des mêmes comptes, qui remplacent dans l'export
+        les reports des compactions avec archivage.
+    """
+    rows = _ledger_rows(queryset)
+    if archived is not None:
+        carries = CompactionCheckpoint.objects.filter(archived=True).exclude(carry=None).values('carry_id')
+        # Les deux tables sont lues dans l'ordre de leur index, la fusion garde cet ordre
+        rows = heapq.merge(_ledger_rows(queryset.exclude(pk__in=carries)), _ledger_rows(archived), key=lambda row: row[:3])
+    for compte_id, created_at, _, amount, description in rows:
+        yield {
+            'compte': compte_id,
+            'created_at': created_at.isoformat(),
+            'amount': str(amount),
+            'description': description,
+        }
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def export_response(queryset, format:str, filename:str, archived=None) -> StreamingHttpResponse:
+    """
+    Réponse HTTP qui diffuse les transactions de ``queryset`` au format ``format``.
+
+    Parameters
+    ----------
+    queryset: QuerySet
+        Transactions à exporter, déjà restreintes au périmètre de l'utilisateur.
+    archived: QuerySet
+        Transactions archivées, restreintes au même périmètre (voir ``export_rows``).
+    format: str
+        ``csv`` ou ``jsonl``.
+    filename: str
+        Nom du fichier proposé au téléchargement, sans extension.
+    """
+    if format not in FORMATS:
+        raise Http404
+    stream = stream_csv if format == 'csv' else stream_jsonl
+    response = StreamingHttpResponse(stream(export_rows(queryset, archived)), content_type=FORMATS[format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{format}"'
+    return response
+
+
+def read_rows(file, format:str):
+    """
+    Lit un fichier exporté et renvoie ses lignes une à une, sous forme de
+    couples ``(numéro de ligne, dictionnaire)``. Le dictionnaire vaut ``None``
+    pour une ligne JSON illisible.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_num, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield line_num, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Format inconnu : {format}")
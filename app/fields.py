@@ -0,0 +1,70 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models import Value
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value) -> int:
+    """
+    Convertit un montant (``Decimal``, ``float``, ``int`` ou chaîne) en centimes.
+    """
+    if isinstance(value, float):
+        # repr() donne l'écriture décimale la plus courte : 0.1 -> '0.1'
+        value = repr(value)
+    return int((Decimal(value) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    Montant stocké en base en centimes (entier) et manipulé en ``Decimal`` côté Python.
+
+    Les expressions doivent utiliser ``money()`` pour que leurs constantes soient
+    elles aussi converties en centimes.
+    """
+    description = "Montant en centimes"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).scaleb(-2)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(repr(value) if isinstance(value, float) else value).quantize(CENT)
+        except (InvalidOperation, TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'],
+                code='invalid',
+                params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return value
+        try:
+            return to_cents(value)
+        except (InvalidOperation, TypeError, ValueError) as e:
+            raise e.__class__(f"Field '{self.name}' expected a number but got {value!r}.") from e
+
+    def formfield(self, **kwargs):
+        return super(models.IntegerField, self).formfield(**{
+            'form_class': forms.DecimalField,
+            'decimal_places': 2,
+            'max_digits': 17,
+            **kwargs,
+        })
+
+
+def money(value) -> Value:
+    """
+    Constante à utiliser dans une expression portant sur un ``MoneyField``
+    (ex: ``F('balance') + money(amount)``).
+    """
+    return Value(value, output_field=MoneyField())
@@ -0,0 +1,87 @@
+"""
+Vues asynchrones pour les écrans qui suivent un compte en direct.
+
+Servies par un serveur ASGI (``argentdepoche.asgi``), elles n'occupent pas de
+thread pendant l'attente : une poignée de workers peut garder ouverts des
+milliers de flux ``text/event-stream`` (Server-Sent Events). Sous WSGI ou
+``runserver``, chaque flux ouvert garderait un thread : lancer le projet avec
+``uvicorn argentdepoche.asgi:application`` (voir ``deploy/nginx.conf``).
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from app.api import SUMMARY_FIELDS
+from app.events import channel, get_broker
+from app.models import Compte
+from app.permissions import get_compte_access
+
+# Un commentaire est envoyé après ce délai sans événement, pour que les
+# proxys ne coupent pas la connexion et qu'un client parti soit détecté
+HEARTBEAT = 15
+
+
+async def get_visible_summary(request, compte_id:int) -> dict:
+    """
+    Résumé du compte lu avec l'ORM asynchrone, ``Http404`` s'il n'est pas visible
+    par l'utilisateur (mêmes règles que ``CompteAdmin.get_queryset``).
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise PermissionError
+    if not user.is_superuser:
+        access = await sync_to_async(get_compte_access)(request)
+        if not access.can_view(compte_id):
+            raise Http404
+    summary = await Compte.objects.filter(pk=compte_id).values(*SUMMARY_FIELDS).afirst()
+    if summary is None:
+        raise Http404
+    return summary
+
+
+@require_safe
+async def compte_summary(request, compte_id:int):
+    try:
+        summary = await get_visible_summary(request, compte_id)
+    except PermissionError:
+        return JsonResponse({'detail': "Authentification requise."}, status=401)
+    return JsonResponse(summary)
+
+
+@require_safe
+async def compte_events(request, compte_id:int):
+    """
+    Flux SSE du compte : un événement ``balance`` avec le résumé courant, puis un
+    à chaque écriture validée sur le compte.
+    """
+    # Abonnement avant la lecture du résumé : aucune écriture ne passe entre les deux
+    subscription = await get_broker().asubscribe(channel(compte_id))
+    try:
+        summary = await get_visible_summary(request, compte_id)
+    except PermissionError:
+        subscription.close()
+        return JsonResponse({'detail': "Authentification requise."}, status=401)
+    except Http404:
+        subscription.close()
+        raise
+
+    async def stream():
+        try:
+            yield f"event: balance\ndata: {json.dumps(summary, cls=DjangoJSONEncoder)}\n\n"
+            while True:
+                message = await subscription.next(timeout=HEARTBEAT)
+                if message is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: balance\ndata: {message}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Pas de mise en tampon par nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,90 @@
+import json
+import platform
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from app.benchmarks import CASES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les opérations du grand livre sur des données générées, pour plusieurs tailles, "
+        "dans une base de test jetable (la base configurée n'est pas modifiée)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help="Nombres de transactions à générer.")
+        parser.add_argument('--users', type=int, default=100, help="Nombre d'utilisateurs.")
+        parser.add_argument('--comptes', type=int, default=50, help="Nombre de comptes.")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur.")
+        parser.add_argument('--repeat', type=int, default=20, help="Nombre de mesures par cas.")
+        parser.add_argument('--case', dest='cases', action='append', choices=list(CASES), help="Cas à mesurer (tous par défaut, option répétable).")
+        parser.add_argument('--on-disk', action='store_true', help="Base de test dans un fichier plutôt qu'en mémoire.")
+        parser.add_argument('--output', type=Path, help="Fichier JSON où écrire les résultats.")
+        parser.add_argument('--compare', type=Path, help="Résultats JSON d'un passage précédent à comparer.")
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            try:
+                previous = json.loads(options['compare'].read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Impossible de lire {options['compare']} : {e}")
+
+        results = []
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                if options['on_disk']:
+                    connections['default'].settings_dict['TEST']['NAME'] = str(Path(tmp) / 'bench.sqlite3')
+                for size in options['sizes']:
+                    # Une base neuve par taille : les mesures ne dépendent pas des précédentes
+                    old_config = setup_databases(verbosity=0, interactive=False, aliases=set(connections), serialized_aliases=set())
+                    try:
+                        results += run_benchmarks(
+                            options['users'], options['comptes'], size,
+                            seed=options['seed'], repeat=options['repeat'], cases=options['cases'],
+                        )
+                    finally:
+                        teardown_databases(old_config, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        self._report(results, previous)
+        if options['output']:
+            report = {
+                'created_at': timezone.now().isoformat(),
+                'environment': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'machine': platform.platform(),
+                },
+                'options': {key: options[key] for key in ('users', 'comptes', 'seed', 'repeat', 'on_disk')},
+                'results': results,
+            }
+            options['output'].write_text(json.dumps(report, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}."))
+
+    def _report(self, results, previous):
+        baseline = {}
+        if previous:
+            baseline = {(result['case'], result['transactions']): result for result in previous.get('results', [])}
+        self.stdout.write(f"{'cas':<30} {'transactions':>12} {'médiane (ms)':>13} {'min (ms)':>10} {'requêtes':>9}")
+        for result in results:
+            line = (
+                f"{result['case']:<30} {result['transactions']:>12} {result['median_ms']:>13.3f} "
+                f"{result['min_ms']:>10.3f} {result['queries']:>9}"
+            )
+            before = baseline.get((result['case'], result['transactions']))
+            if before:
+                ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+                line += f"   x{ratio:.2f} ({before['queries']} requête(s) avant)"
+            self.stdout.write(line)
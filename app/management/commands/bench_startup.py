@@ -0,0 +1,56 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ['argentdepoche.settings', 'argentdepoche.settings_worker']
+MODULES = ['app.payroll', 'app.compaction']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le temps de démarrage (django.setup() et import des modules de traitement) "
+        "de chaque profil de settings, dans des processus neufs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', dest='profiles', action='append', help="Module de settings à mesurer (option répétable, par défaut le profil complet et le profil worker).")
+        parser.add_argument('--module', dest='modules', action='append', help="Module importé après django.setup() (option répétable).")
+        parser.add_argument('--repeat', type=int, default=10, help="Nombre de démarrages par profil.")
+        parser.add_argument('--top', type=int, default=10, help="Nombre d'imports les plus coûteux affichés par profil (-X importtime).")
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or MODULES
+        code = f"import django; django.setup(); import {', '.join(modules)}"
+        results = {}
+        for profile in options['profiles'] or PROFILES:
+            env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                process = subprocess.run([sys.executable, '-c', code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+                timings.append((time.perf_counter() - started) * 1000)
+                if process.returncode:
+                    raise CommandError(f"{profile} : échec du démarrage\n{process.stderr}")
+            results[profile] = statistics.median(timings)
+
+            # Imports de premier niveau les plus coûteux (temps cumulé, en microsecondes)
+            process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            imports = []
+            for line in process.stderr.splitlines():
+                parts = line.split('|')
+                if len(parts) == 3 and parts[2].startswith(' ') and not parts[2].startswith('  ') and parts[1].strip().isdigit():
+                    imports.append((int(parts[1]), parts[2].strip()))
+            self.stdout.write(f"{profile} : {results[profile]:.0f} ms (médiane de {options['repeat']}), {len(imports)} import(s) de premier niveau")
+            for cumulative, name in sorted(imports, reverse=True)[:options['top']]:
+                self.stdout.write(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+        reference = results.get(PROFILES[0])
+        if reference:
+            for profile, median in results.items():
+                if profile != PROFILES[0]:
+                    self.stdout.write(self.style.SUCCESS(f"{profile} : {median / reference:.0%} du temps du profil complet."))
@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db.transaction import atomic
+
+from app.cache import invalidate_access
+from app.models import Compte
+from app.workers import map_in_processes
+
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+NAME_MAX_LENGTH = Compte._meta.get_field('name').max_length
+
+
+def read_people(file, format:str):
+    """
+    Lit le fichier d'inscription et renvoie ses lignes une à une, sous forme de
+    couples ``(numéro de ligne, dictionnaire)``.
+
+    Une ligne sans ``parent`` décrit un parent, une ligne avec ``parent`` un
+    enfant dont le compte sera géré par ce parent. En JSON, le fichier est une
+    liste d'objets ; un parent peut aussi porter ses enfants dans ``children``.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'json':
+        try:
+            people = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON illisible : {e}")
+        if not isinstance(people, list):
+            raise ValueError("le fichier JSON doit contenir une liste")
+        for num, person in enumerate(people, start=1):
+            if not isinstance(person, dict):
+                yield num, None
+                continue
+            children = person.pop('children', None) or []
+            yield num, person
+            for child in children:
+                yield num, dict(child, parent=person.get('username')) if isinstance(child, dict) else None
+    else:
+        raise ValueError(f"Format inconnu : {format}")
+
+
+def parse_person(row) -> dict:
+    """
+    Personne décrite par une ligne du fichier, ``ValueError`` si elle est invalide.
+    """
+    if row is None:
+        raise ValueError("ligne illisible")
+    person = {field: str(row.get(field) or '').strip() for field in USER_FIELDS + ('parent', 'compte')}
+    if not person['username']:
+        raise ValueError("colonne username manquante")
+    try:
+        User.username_validator(person['username'])
+    except ValidationError:
+        raise ValueError(f"nom d'utilisateur invalide : {person['username']!r}")
+    if person['email']:
+        try:
+            validate_email(person['email'])
+        except ValidationError:
+            raise ValueError(f"email invalide : {person['email']!r}")
+    # Sans mot de passe, le compte est créé avec un mot de passe inutilisable
+    person['password'] = str(row.get('password') or '') or None
+    if person['parent']:
+        person['compte'] = person['compte'] or person['first_name'] or person['username']
+        if len(person['compte']) > NAME_MAX_LENGTH:
+            raise ValueError(f"nom de compte trop long (max {NAME_MAX_LENGTH}) : {person['compte']!r}")
+        try:
+            person['salary'] = Decimal(str(row.get('salary') or 0))
+        except InvalidOperation:
+            raise ValueError(f"salaire invalide : {row.get('salary')!r}")
+        if not person['salary'].is_finite() or person['salary'] < 0 or person['salary'] != person['salary'].quantize(Decimal('0.01')):
+            raise ValueError(f"salaire invalide : {row.get('salary')!r}")
+    return person
+
+
+class Command(BaseCommand):
+    help = "Inscrit en une fois des familles (parents et enfants) depuis un fichier CSV ou JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help="Fichier à importer (.csv ou .json).")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Format du fichier, déduit de l'extension par défaut.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Nombre de processus qui hachent les mots de passe.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Nombre d'utilisateurs créés par transaction SQL.")
+        parser.add_argument('--dry-run', action='store_true', help="Valide le fichier sans rien créer.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or path.suffix.lstrip('.')
+        if format not in ('csv', 'json'):
+            raise CommandError("Format inconnu, préciser --format csv ou --format json.")
+
+        # Validation complète avant d'écrire quoi que ce soit
+        errors = []
+        people = []
+        with path.open(newline='', encoding='utf-8') as file:
+            try:
+                for line_num, row in read_people(file, format):
+                    try:
+                        people.append(parse_person(row))
+                    except ValueError as e:
+                        errors.append(f"ligne {line_num} : {e}")
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        usernames = [person['username'] for person in people]
+        seen = set()
+        duplicates = {username for username in usernames if username in seen or seen.add(username)}
+        if duplicates:
+            errors.append(f"utilisateur(s) en double dans le fichier : {', '.join(sorted(duplicates))}")
+        existing = set()
+        for start in range(0, len(usernames), 500):
+            existing.update(User.objects.filter(username__in=usernames[start:start + 500]).values_list('username', flat=True))
+        if existing:
+            errors.append(f"utilisateur(s) déjà inscrit(s) : {', '.join(sorted(existing))}")
+
+        parents = {person['username'] for person in people if not person['parent']}
+        # Un enfant peut être rattaché à un parent déjà inscrit
+        outside = {person['parent'] for person in people if person['parent'] and person['parent'] not in parents}
+        manager_ids = dict(User.objects.filter(username__in=outside).values_list('username', 'pk'))
+        unknown = outside - set(manager_ids)
+        if unknown:
+            errors.append(f"parent(s) inconnu(s) : {', '.join(sorted(unknown))}")
+        if errors:
+            for error in errors[:50]:
+                self.stderr.write(error)
+            raise CommandError(f"{len(errors)} erreur(s), personne n'a été inscrit.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(people)} personne(s) valide(s)."))
+            return
+
+        # Les parents d'abord : leurs identifiants sont connus quand arrivent les comptes des enfants
+        people.sort(key=lambda person: bool(person['parent']))
+        passwords = [person['password'] for person in people]
+        workers = options['workers']
+        if workers <= 1:
+            hashes = map(make_password, passwords)
+        else:
+            # Le hachage (PBKDF2) domine le coût : réparti sur plusieurs processus,
+            # les insertions se font au fil des résultats
+            hashes = map_in_processes(
+                'django.contrib.auth.hashers.make_password', passwords, workers,
+                chunksize=max(1, min(64, len(passwords) // (workers * 4))),
+            )
+
+        started = time.perf_counter()
+        writing = 0
+        created = 0
+        chunk_size = options['chunk_size']
+        chunk = []
+        for person, password in zip(people, hashes):
+            chunk.append((person, password))
+            if len(chunk) >= chunk_size:
+                writing += self._create(chunk, manager_ids)
+                created += len(chunk)
+                chunk = []
+        if chunk:
+            writing += self._create(chunk, manager_ids)
+            created += len(chunk)
+        elapsed = time.perf_counter() - started
+
+        children = len(people) - len(parents)
+        self.stdout.write(
+            f"{created} utilisateur(s) ({len(parents)} parent(s), {children} enfant(s)) et {children} compte(s) "
+            f"créés en {elapsed:.2f} s ({created / elapsed if elapsed else created:.0f}/s), "
+            f"dont {writing:.2f} s d'écriture en base, avec {max(workers, 1)} processus de hachage."
+        )
+        self.stdout.write(self.style.SUCCESS(f"{created} personne(s) inscrite(s)."))
+
+    def _create(self, chunk, manager_ids:dict) -> float:
+        """
+        Crée les utilisateurs d'un lot puis les comptes des enfants, dans une
+        même transaction. Renvoie la durée de l'écriture.
+        """
+        started = time.perf_counter()
+        with atomic():
+            users = User.objects.bulk_create([
+                User(password=password, is_staff=True, **{field: person[field] for field in USER_FIELDS})
+                for person, password in chunk
+            ])
+            for (person, _), user in zip(chunk, users):
+                if not person['parent']:
+                    manager_ids[user.username] = user.pk
+            Compte.objects.bulk_create([
+                Compte(
+                    name=person['compte'], client_id=user.pk,
+                    manager_id=manager_ids[person['parent']], salary=person['salary'],
+                )
+                for (person, _), user in zip(chunk, users) if person['parent']
+            ])
+            # Les nouveaux comptes changent les droits d'accès de leurs parents
+            invalidate_access()
+        return time.perf_counter() - started
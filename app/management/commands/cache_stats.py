@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app import cache
+
+
+class Command(BaseCommand):
+    help = "Affiche les compteurs de succès et d'échecs du cache des comptes (partagés par tous les processus, voir CACHE_DIR)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Remet les compteurs à zéro après affichage.")
+
+    def handle(self, *args, **options):
+        stats = cache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = f"{100 * stats['hits'] / total:.1f} %" if total else "-"
+        self.stdout.write(f"Succès : {stats['hits']}, échecs : {stats['misses']}, taux de succès : {ratio}")
+        if options['reset']:
+            cache.reset_stats()
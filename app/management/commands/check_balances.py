@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+
+from app.models import Compte
+
+
+class Command(BaseCommand):
+    help = "Vérifie le solde stocké de chaque compte par rapport à ses transactions et le reconstruit en cas d'écart."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les écarts sans corriger les soldes.")
+
+    def handle(self, *args, **options):
+        comptes = Compte.objects.with_ledger_total().values_list('pk', 'name', 'balance', 'ledger_total')
+        mismatches = []
+        for pk, name, balance, ledger_total in comptes.iterator():
+            if balance != ledger_total:
+                mismatches.append(pk)
+                self.stdout.write(f"{name} (#{pk}) : solde stocké {balance}, grand livre {ledger_total}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Tous les soldes sont cohérents."))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} compte(s) incohérent(s)."))
+            return
+
+        with atomic():
+            # On recalcule à partir du grand livre au moment de la correction,
+            # pas à partir des sommes lues plus haut qui ont pu changer depuis
+            rebuilt = Compte.objects.filter(pk__in=mismatches).rebuild_balances()
+        self.stdout.write(self.style.SUCCESS(f"{rebuilt} solde(s) reconstruit(s)."))
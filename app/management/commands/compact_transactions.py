@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from app.compaction import as_cutoff, compact_all
+
+
+class Command(BaseCommand):
+    help = "Compacte les transactions de tous les comptes jusqu'à une date incluse."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, required=True, help="Compacte les transactions jusqu'à cette date incluse (AAAA-MM-JJ).")
+        parser.add_argument('--workers', type=int, default=1, help="Nombre de processus.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Nombre de transactions compactées par transaction SQL.")
+        parser.add_argument('--archive', action='store_true', help="Déplace les transactions compactées dans les archives au lieu de les supprimer.")
+
+    def handle(self, *args, **options):
+        # Même fin de journée que compact_compte et compress_transactions
+        before = as_cutoff(options['before'])
+        removed = compact_all(before, workers=options['workers'], chunk_size=options['chunk_size'], archive=options['archive'])
+        self.stdout.write(self.style.SUCCESS(f"{removed} transaction(s) {'archivée(s)' if options['archive'] else 'compactée(s)'}."))
@@ -0,0 +1,46 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.statements import generate_statements
+
+
+def parse_month(value:str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Mois invalide (AAAA-MM attendu) : {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Écrit les relevés mensuels (HTML et CSV) des comptes ayant eu des transactions dans le mois. "
+        "Les relevés déjà écrits sont conservés : relancer la commande reprend une génération interrompue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Mois des relevés (AAAA-MM), le mois précédent par défaut.")
+        parser.add_argument('--output', type=Path, default=Path('statements'), help="Dossier des relevés, un sous-dossier par mois.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Nombre de processus.")
+        parser.add_argument('--compte', type=int, action='append', dest='comptes', help="Compte à traiter (tous par défaut, option répétable).")
+        parser.add_argument('--force', action='store_true', help="Réécrit les relevés déjà présents.")
+
+    def handle(self, *args, **options):
+        if options['month']:
+            month = parse_month(options['month'])
+        else:
+            month = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+        started = time.perf_counter()
+        written, skipped = generate_statements(
+            month, options['output'], workers=options['workers'], force=options['force'], compte_ids=options['comptes'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{written} relevé(s) de {month.strftime('%Y-%m')} écrit(s) dans {options['output']} en {elapsed:.2f} s "
+            f"({written / elapsed if elapsed else written:.0f}/s), {skipped} déjà présent(s)."
+        )
+        self.stdout.write(self.style.SUCCESS(f"{written + skipped} relevé(s) à jour."))
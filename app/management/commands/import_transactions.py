@@ -0,0 +1,156 @@
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import BigIntegerField, F
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app.cache import invalidate_comptes
+from app.exports import EXPORT_FIELDS, read_rows
+from app.fields import CENT, money
+from app.models import BalanceSnapshot, Compte, Transaction, WeeklyRollup
+
+MAX_BIGINT = BigIntegerField.MAX_BIGINT
+
+
+def parse_row(row) -> Transaction:
+    """
+    Transaction décrite par une ligne du fichier, ``ValueError`` si elle est invalide.
+    """
+    if row is None:
+        raise ValueError("ligne illisible")
+    missing = [field for field in EXPORT_FIELDS if field not in row or row[field] is None]
+    if missing:
+        raise ValueError(f"colonne(s) manquante(s) : {', '.join(missing)}")
+    try:
+        compte_id = int(row['compte'])
+    except (TypeError, ValueError):
+        raise ValueError(f"compte invalide : {row['compte']!r}")
+    created_at = parse_datetime(str(row['created_at']))
+    if created_at is None:
+        raise ValueError(f"date invalide : {row['created_at']!r}")
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    try:
+        amount = Decimal(str(row['amount']))
+        valid = amount.is_finite() and amount == amount.quantize(CENT)
+    except InvalidOperation:
+        # quantize échoue aussi sur les montants trop grands (1e30)
+        valid = False
+    # Les montants sont stockés en centimes dans un BigIntegerField
+    if not valid or not -MAX_BIGINT - 1 <= amount.scaleb(2) <= MAX_BIGINT:
+        raise ValueError(f"montant invalide : {row['amount']!r}")
+    return Transaction(compte_id=compte_id, created_at=created_at, amount=amount, description=row['description'])
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des transactions depuis un export CSV ou JSON Lines et met à jour les soldes. "
+        "Le fichier est d'abord validé en entier : s'il contient une erreur, rien n'est importé. "
+        "Il est ensuite écrit par lots de --chunk-size transactions, chaque lot dans sa propre "
+        "transaction pour ne pas bloquer les autres écritures : un import interrompu garde les "
+        "lots déjà écrits, le nombre de transactions écrites est affiché après chaque lot et "
+        "l'import se reprend avec --skip <nombre>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help="Fichier à importer (.csv ou .jsonl).")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format du fichier, déduit de l'extension par défaut.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Nombre de transactions écrites par lot (une transaction de base de données par lot).")
+        parser.add_argument('--skip', type=int, default=0, help="Ignore les N premières transactions du fichier, déjà importées par un import interrompu.")
+        parser.add_argument('--dry-run', action='store_true', help="Valide le fichier sans rien importer.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        format = options['format'] or path.suffix.lstrip('.')
+        if format not in ('csv', 'jsonl'):
+            raise CommandError("Format inconnu, préciser --format csv ou --format jsonl.")
+
+        # Première lecture : validation complète, rien n'est écrit si le fichier a une erreur
+        errors = []
+        compte_ids = set()
+        count = 0
+        with path.open(newline='', encoding='utf-8') as file:
+            for line_num, row in read_rows(file, format):
+                try:
+                    transaction = parse_row(row)
+                except ValueError as e:
+                    errors.append(f"ligne {line_num} : {e}")
+                    continue
+                compte_ids.add(transaction.compte_id)
+                count += 1
+        unknown = compte_ids - set(Compte.objects.filter(pk__in=compte_ids).values_list('pk', flat=True))
+        if unknown:
+            errors.append(f"compte(s) inconnu(s) : {', '.join(map(str, sorted(unknown)))}")
+        skip = options['skip']
+        if not 0 <= skip <= count:
+            errors.append(f"--skip doit être compris entre 0 et {count}")
+        if errors:
+            for error in errors[:50]:
+                self.stderr.write(error)
+            raise CommandError(f"{len(errors)} erreur(s), aucune transaction importée.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{count} transaction(s) valide(s)."))
+            return
+
+        # Seconde lecture : chaque lot est écrit et validé dans sa propre transaction,
+        # le verrou d'écriture est relâché entre deux lots
+        chunk_size = options['chunk_size']
+        compte_ids = set()
+        written = skip
+        try:
+            with path.open(newline='', encoding='utf-8') as file:
+                chunk = []
+                for _, row in islice(read_rows(file, format), skip, None):
+                    chunk.append(parse_row(row))
+                    if len(chunk) >= chunk_size:
+                        written = self._write_chunk(chunk, compte_ids, written)
+                        chunk = []
+                written = self._write_chunk(chunk, compte_ids, written)
+        except BaseException:
+            # Les lots précédents sont validés : la reprise doit les sauter
+            self.stderr.write(f"Import interrompu après {written} transaction(s), reprendre avec --skip {written}.")
+            raise
+
+        self.stdout.write(self.style.SUCCESS(f"{count - skip} transaction(s) importée(s) sur {len(compte_ids)} compte(s)."))
+
+    def _write_chunk(self, chunk, compte_ids:set, written:int) -> int:
+        """
+        Écrit un lot et affiche le nombre de transactions du fichier déjà
+        écrites, la valeur de ``--skip`` pour reprendre après ce lot.
+        """
+        if not chunk:
+            return written
+        compte_ids.update(self._insert(chunk))
+        written += len(chunk)
+        if self.verbosity > 0:
+            self.stdout.write(f"{written} transaction(s) écrite(s)")
+        return written
+
+    def _insert(self, chunk) -> set:
+        """
+        Écrit un lot de transactions et le répercute sur les soldes, les relevés
+        et les cumuls hebdomadaires. Renvoie les comptes modifiés.
+        """
+        if not chunk:
+            return set()
+        totals = defaultdict(Decimal)
+        for transaction in chunk:
+            totals[transaction.compte_id] += transaction.amount
+        with atomic():
+            Transaction.objects.bulk_create(chunk)
+            for compte_id, total in totals.items():
+                Compte.objects.filter(pk=compte_id).update(balance=F('balance') + money(total), version=F('version') + 1)
+            invalidate_comptes(totals)
+            entries = [(t.compte_id, t.created_at, t.amount) for t in chunk]
+            # Les transactions importées peuvent être antérieures aux relevés existants :
+            # record met à jour les mois concernés et les suivants
+            BalanceSnapshot.objects.record(entries)
+            # Les semaines compactées gardent leurs cumuls : pas de reconstruction, on ajoute
+            WeeklyRollup.objects.record(entries)
+        return set(totals)
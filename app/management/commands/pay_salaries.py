@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app.payroll import pay_due_salaries
+
+
+class Command(BaseCommand):
+    help = "Verse le salaire hebdomadaire de tous les comptes arrivés à échéance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Nombre de comptes traités par transaction.")
+
+    def handle(self, *args, **options):
+        processed = pay_due_salaries(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{processed} compte(s) payé(s)."))
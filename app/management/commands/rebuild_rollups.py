@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+
+from app.models import Compte, WeeklyRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les cumuls hebdomadaires (entrées, sorties) à partir du grand livre. "
+        "Les semaines compactées gardent leurs cumuls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compte', type=int, action='append', dest='comptes', help="Compte à recalculer (tous par défaut, option répétable).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Nombre de comptes recalculés par transaction SQL.")
+
+    def handle(self, *args, **options):
+        compte_ids = options['comptes'] or list(Compte.objects.order_by('pk').values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        for start in range(0, len(compte_ids), chunk_size):
+            with atomic():
+                WeeklyRollup.objects.rebuild(compte_ids[start:start + chunk_size])
+        count = WeeklyRollup.objects.filter(compte_id__in=compte_ids).count() if options['comptes'] else WeeklyRollup.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"{count} cumul(s) hebdomadaire(s) pour {len(compte_ids)} compte(s)."))
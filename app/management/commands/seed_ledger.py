@@ -0,0 +1,40 @@
+import time
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.seeding import seed_ledger
+
+
+class Command(BaseCommand):
+    help = "Génère des utilisateurs, des comptes et des transactions reproductibles à partir d'une graine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Nombre d'utilisateurs.")
+        parser.add_argument('--comptes', type=int, default=50, help="Nombre de comptes.")
+        parser.add_argument('--transactions', type=int, default=10000, help="Nombre de transactions.")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur.")
+        parser.add_argument('--until', type=date.fromisoformat, help="Date de fin (AAAA-MM-JJ), aujourd'hui par défaut.")
+        parser.add_argument('--days', type=int, default=365, help="Période couverte par les transactions, en jours.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Exposant de la loi de Zipf (0 : répartition uniforme).")
+        parser.add_argument('--prefix', default='seed', help="Préfixe des noms d'utilisateur.")
+
+    def handle(self, *args, **options):
+        until = options['until'] and timezone.make_aware(datetime.combine(options['until'], datetime.min.time()))
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Des utilisateurs « {options['prefix']}… » existent déjà, choisir un autre --prefix.")
+        started = time.perf_counter()
+        try:
+            compte_ids = seed_ledger(
+                options['users'], options['comptes'], options['transactions'], seed=options['seed'],
+                until=until, days=options['days'], skew=options['skew'], prefix=options['prefix'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['users']} utilisateur(s), {len(compte_ids)} compte(s) et {options['transactions']} transaction(s) "
+            f"créés en {elapsed:.2f} s."
+        ))
@@ -0,0 +1,88 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from app.models import Compte
+
+
+class Command(BaseCommand):
+    help = "Lance des débits simultanés sur un même compte et vérifie que le solde ne devient jamais négatif."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compte', type=int, help="Compte à débiter (par défaut, un compte temporaire supprimé à la fin), avec --force.")
+        parser.add_argument('--force', action='store_true', help="Accepte de débiter réellement le compte donné par --compte : ses débits \"Stress\" restent dans son historique.")
+        parser.add_argument('--threads', type=int, default=8, help="Nombre de threads.")
+        parser.add_argument('--debits', type=int, default=100, help="Nombre de débits par thread.")
+        parser.add_argument('--amount', type=Decimal, default=Decimal('1.00'), help="Montant de chaque débit.")
+        parser.add_argument('--initial', type=Decimal, default=Decimal('500.00'), help="Solde du compte temporaire.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['compte']:
+            if not options['force']:
+                raise CommandError(
+                    "Les débits sur un compte existant sont réels et restent dans son historique : "
+                    "ajouter --force, ou omettre --compte pour utiliser un compte temporaire."
+                )
+            compte = Compte.objects.get(pk=options['compte'])
+        else:
+            user = User.objects.create_user(f"stress-{time.time_ns()}")
+            compte = Compte.objects.create(name='Stress', manager=user, client=user)
+            compte.add_money(options['initial'])
+        try:
+            self._run(compte, options)
+        finally:
+            if user is not None:
+                user.delete()
+
+    def _run(self, compte, options):
+        start_balance = Compte.objects.get(pk=compte.pk).balance
+        amount = options['amount']
+        counts = {'debited': 0, 'refused': 0, 'locked': 0}
+        lock = threading.Lock()
+        negative = []
+
+        def worker():
+            # Chaque thread a sa propre connexion, comme un processus serveur
+            account = Compte.objects.get(pk=compte.pk)
+            try:
+                for _ in range(options['debits']):
+                    try:
+                        account.take_money(amount, description='Stress')
+                        outcome = 'debited'
+                    except ValueError:
+                        outcome = 'refused'
+                    except OperationalError:
+                        outcome = 'locked'
+                    if account.balance < 0:
+                        negative.append(account.balance)
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        compte.refresh_from_db(fields=['balance'])
+        ledger_total = compte.transactions.get_total_amount()
+        attempts = sum(counts.values())
+        self.stdout.write(
+            f"{attempts} débit(s) en {elapsed:.2f} s ({attempts / elapsed:.0f}/s) : "
+            f"{counts['debited']} effectué(s), {counts['refused']} refusé(s), {counts['locked']} base verrouillée."
+        )
+        self.stdout.write(f"Solde : {start_balance} -> {compte.balance} (grand livre : {ledger_total})")
+
+        expected = start_balance - counts['debited'] * amount
+        if negative or compte.balance < 0 or compte.balance != expected or compte.balance != ledger_total:
+            raise CommandError("Solde incohérent après les débits simultanés.")
+        self.stdout.write(self.style.SUCCESS("Le solde n'est jamais devenu négatif."))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-17 18:56
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_balance(apps, schema_editor):
+    Compte = apps.get_model('app', 'Compte')
+    Transaction = apps.get_model('app', 'Transaction')
+    ledger_total = Transaction.objects.filter(compte=OuterRef('pk')).values('compte').annotate(total=Sum('amount')).values('total')
+    Compte.objects.update(balance=Coalesce(Subquery(ledger_total), Value(0.0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_alter_compte_client_alter_compte_last_salary_payment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compte',
+            name='balance',
+            field=models.FloatField(default=0, editable=False, help_text='Solde du compte, mis à jour à chaque transaction.', verbose_name='Balance'),
+        ),
+        migrations.RunPython(populate_balance, migrations.RunPython.noop),
+    ]
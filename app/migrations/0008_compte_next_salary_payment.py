@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 18:57
+
+import django.utils.timezone
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def schedule_from_last_payment(apps, schema_editor):
+    # Les comptes déjà payés reprennent une semaine après leur dernier versement,
+    # les autres gardent la date de migration et seront payés au prochain passage
+    Compte = apps.get_model('app', 'Compte')
+    Compte.objects.filter(last_salary_payment__isnull=False).update(
+        next_salary_payment=F('last_salary_payment') + timedelta(days=7)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_compte_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compte',
+            name='next_salary_payment',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Date du prochain versement automatique du salaire.', verbose_name='Next salary payment'),
+        ),
+        migrations.RunPython(schedule_from_last_payment, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_compte_next_salary_payment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Créé à'),
+        ),
+        migrations.CreateModel(
+            name='CompactionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateTimeField(verbose_name='Cutoff')),
+                ('compacted', models.PositiveIntegerField(default=0, verbose_name='Compacted transactions')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('carry', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.transaction')),
+                ('compte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compactions', to='app.compte', verbose_name='Compte')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('compte', 'cutoff'), name='unique_compaction_per_cutoff')],
+            },
+        ),
+    ]
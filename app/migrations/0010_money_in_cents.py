@@ -0,0 +1,101 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:03
+
+import app.fields
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+
+def cents(field_name):
+    return Cast(Round(F(field_name) * 100), output_field=models.BigIntegerField())
+
+
+def float_to_cents(apps, schema_editor):
+    Compte = apps.get_model('app', 'Compte')
+    Transaction = apps.get_model('app', 'Transaction')
+    Compte.objects.update(new_salary=cents('salary'), new_balance=cents('balance'))
+    Transaction.objects.update(new_amount=cents('amount'))
+
+
+def euros(field_name):
+    return Cast(F(field_name), output_field=models.FloatField()) / 100
+
+
+def cents_to_float(apps, schema_editor):
+    Compte = apps.get_model('app', 'Compte')
+    Transaction = apps.get_model('app', 'Transaction')
+    Compte.objects.update(salary=euros('new_salary'), balance=euros('new_balance'))
+    Transaction.objects.update(amount=euros('new_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_compaction_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compte',
+            name='new_salary',
+            field=app.fields.MoneyField(db_column='salary_cents', default=0, help_text='Montant du salaire hebdomadaire automatique.', verbose_name='Salaire'),
+        ),
+        migrations.AddField(
+            model_name='compte',
+            name='new_balance',
+            field=app.fields.MoneyField(db_column='balance_cents', default=0, editable=False, help_text='Solde du compte, mis à jour à chaque transaction.', verbose_name='Balance'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='new_amount',
+            field=app.fields.MoneyField(db_column='amount_cents', default=0, verbose_name='Montant'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(float_to_cents, cents_to_float),
+        # Sans effet sur la base : donne un défaut à l'ancienne colonne pour
+        # qu'elle puisse être recréée quand la migration est annulée
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='transaction',
+                name='amount',
+                field=models.FloatField(default=0, verbose_name='Montant'),
+            ),
+        ]),
+        migrations.RemoveField(
+            model_name='compte',
+            name='salary',
+        ),
+        migrations.RemoveField(
+            model_name='compte',
+            name='balance',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='compte',
+            old_name='new_salary',
+            new_name='salary',
+        ),
+        migrations.RenameField(
+            model_name='compte',
+            old_name='new_balance',
+            new_name='balance',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='new_amount',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='compte',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='app.compte', verbose_name='Compte'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['compte', 'created_at', 'amount'], name='transaction_ledger_idx'),
+        ),
+    ]
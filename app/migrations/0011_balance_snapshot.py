@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:04
+
+import app.fields
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def build_snapshots(apps, schema_editor):
+    Transaction = apps.get_model('app', 'Transaction')
+    BalanceSnapshot = apps.get_model('app', 'BalanceSnapshot')
+    monthly_totals = (
+        Transaction.objects.annotate(month=TruncMonth('created_at'))
+        .values('compte_id', 'month')
+        .annotate(total=Sum('amount'))
+        .order_by('compte_id', 'month')
+    )
+    snapshots = []
+    balances = defaultdict(Decimal)
+    for row in monthly_totals.iterator():
+        month = timezone.localtime(row['month'])
+        year, next_month = (month.year + 1, 1) if month.month == 12 else (month.year, month.month + 1)
+        balances[row['compte_id']] += row['total']
+        snapshots.append(BalanceSnapshot(
+            compte_id=row['compte_id'],
+            period_end=timezone.make_aware(datetime(year, next_month, 1)),
+            balance=balances[row['compte_id']],
+        ))
+    BalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_money_in_cents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_end', models.DateTimeField(verbose_name='Period end')),
+                ('balance', app.fields.MoneyField(db_column='balance_cents', verbose_name='Balance')),
+                ('compte', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='app.compte', verbose_name='Compte')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('compte', 'period_end'), name='unique_snapshot_per_period')],
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:12
+
+from django.db import migrations
+
+# Index plein texte FTS5 (SQLite uniquement), tenu à jour par des triggers :
+# les insertions, suppressions (compaction) et renommages de compte s'y reflètent
+# dans la même transaction que l'écriture d'origine.
+CREATE_SEARCH = [
+    """
+    CREATE VIRTUAL TABLE app_transaction_search USING fts5(
+        description, compte_name, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE app_compte_search USING fts5(
+        name, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER app_transaction_search_insert AFTER INSERT ON app_transaction BEGIN
+        INSERT INTO app_transaction_search (rowid, description, compte_name)
+        SELECT new.id, new.description, name FROM app_compte WHERE id = new.compte_id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_transaction_search_update AFTER UPDATE OF description, compte_id ON app_transaction BEGIN
+        UPDATE app_transaction_search
+        SET description = new.description,
+            compte_name = (SELECT name FROM app_compte WHERE id = new.compte_id)
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_transaction_search_delete AFTER DELETE ON app_transaction BEGIN
+        DELETE FROM app_transaction_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_compte_search_insert AFTER INSERT ON app_compte BEGIN
+        INSERT INTO app_compte_search (rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER app_compte_search_update AFTER UPDATE OF name ON app_compte BEGIN
+        UPDATE app_compte_search SET name = new.name WHERE rowid = new.id;
+        UPDATE app_transaction_search SET compte_name = new.name
+        WHERE rowid IN (SELECT id FROM app_transaction WHERE compte_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER app_compte_search_delete AFTER DELETE ON app_compte BEGIN
+        DELETE FROM app_compte_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO app_transaction_search (rowid, description, compte_name)
+    SELECT t.id, t.description, c.name FROM app_transaction t JOIN app_compte c ON c.id = t.compte_id
+    """,
+    """
+    INSERT INTO app_compte_search (rowid, name) SELECT id, name FROM app_compte
+    """,
+]
+
+DROP_SEARCH = [
+    "DROP TRIGGER IF EXISTS app_compte_search_delete",
+    "DROP TRIGGER IF EXISTS app_compte_search_update",
+    "DROP TRIGGER IF EXISTS app_compte_search_insert",
+    "DROP TRIGGER IF EXISTS app_transaction_search_delete",
+    "DROP TRIGGER IF EXISTS app_transaction_search_update",
+    "DROP TRIGGER IF EXISTS app_transaction_search_insert",
+    "DROP TABLE IF EXISTS app_compte_search",
+    "DROP TABLE IF EXISTS app_transaction_search",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_balance_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SEARCH), run_on_sqlite(DROP_SEARCH)),
+    ]
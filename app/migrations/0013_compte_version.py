@@ -0,0 +1,77 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:13
+
+from django.db import migrations, models
+
+# L'ajout de colonne reconstruit app_compte sur SQLite, ce qui supprime les
+# triggers des index plein texte (0012) : ils sont recréés à l'identique.
+# Le SQL est recopié ici pour que la migration ne dépende pas du code courant.
+SEARCH_TRIGGERS = {
+    'app_transaction_search_insert': """
+        CREATE TRIGGER app_transaction_search_insert AFTER INSERT ON app_transaction BEGIN
+            INSERT INTO app_transaction_search (rowid, description, compte_name)
+            SELECT new.id, new.description, name FROM app_compte WHERE id = new.compte_id;
+        END
+    """,
+    'app_transaction_search_update': """
+        CREATE TRIGGER app_transaction_search_update AFTER UPDATE OF description, compte_id ON app_transaction BEGIN
+            UPDATE app_transaction_search
+            SET description = new.description,
+                compte_name = (SELECT name FROM app_compte WHERE id = new.compte_id)
+            WHERE rowid = new.id;
+        END
+    """,
+    'app_transaction_search_delete': """
+        CREATE TRIGGER app_transaction_search_delete AFTER DELETE ON app_transaction BEGIN
+            DELETE FROM app_transaction_search WHERE rowid = old.id;
+        END
+    """,
+    'app_compte_search_insert': """
+        CREATE TRIGGER app_compte_search_insert AFTER INSERT ON app_compte BEGIN
+            INSERT INTO app_compte_search (rowid, name) VALUES (new.id, new.name);
+        END
+    """,
+    'app_compte_search_update': """
+        CREATE TRIGGER app_compte_search_update AFTER UPDATE OF name ON app_compte BEGIN
+            UPDATE app_compte_search SET name = new.name WHERE rowid = new.id;
+            UPDATE app_transaction_search SET compte_name = new.name
+            WHERE rowid IN (SELECT id FROM app_transaction WHERE compte_id = new.id);
+        END
+    """,
+    'app_compte_search_delete': """
+        CREATE TRIGGER app_compte_search_delete AFTER DELETE ON app_compte BEGIN
+            DELETE FROM app_compte_search WHERE rowid = old.id;
+        END
+    """,
+}
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name, statement in SEARCH_TRIGGERS.items():
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema_editor.execute(statement)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in SEARCH_TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_transaction_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='compte',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrémentée à chaque modification des transactions du compte.', verbose_name='Version'),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:29
+
+import app.fields
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+
+def build_rollups(apps, schema_editor):
+    Transaction = apps.get_model('app', 'Transaction')
+    WeeklyRollup = apps.get_model('app', 'WeeklyRollup')
+    CompactionCheckpoint = apps.get_model('app', 'CompactionCheckpoint')
+    # Les transactions "Situation au ..." des compactions ne sont pas des mouvements
+    carries = CompactionCheckpoint.objects.exclude(carry_id=None).values('carry_id')
+    weekly_totals = (
+        Transaction.objects.exclude(pk__in=carries)
+        .annotate(week=TruncWeek('created_at'))
+        .values('compte_id', 'week')
+        .annotate(credit=Sum('amount', filter=Q(amount__gte=0)), debit=Sum('amount', filter=Q(amount__lt=0)), count=Count('id'))
+        .order_by()
+    )
+    rollups = []
+    for row in weekly_totals.iterator():
+        day = timezone.localtime(row['week']).date()
+        rollups.append(WeeklyRollup(
+            compte_id=row['compte_id'],
+            week=day - timedelta(days=day.weekday()),
+            credit=row['credit'] or 0,
+            debit=-(row['debit'] or 0),
+            count=row['count'],
+        ))
+    WeeklyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_compte_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField(help_text='Lundi de la semaine.', verbose_name='Week')),
+                ('credit', app.fields.MoneyField(db_column='credit_cents', default=0, verbose_name='Money in')),
+                ('debit', app.fields.MoneyField(db_column='debit_cents', default=0, help_text='Total des débits, en positif.', verbose_name='Money out')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Transactions')),
+                ('compte', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='app.compte', verbose_name='Compte')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('compte', 'week'), name='unique_rollup_per_week')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:38
+
+import app.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_weekly_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compactioncheckpoint',
+            name='archived',
+            field=models.BooleanField(default=False, help_text='Transactions compactées conservées dans les archives.', verbose_name='Archived'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', app.fields.MoneyField(db_column='amount_cents', verbose_name='Montant')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Description')),
+                ('created_at', models.DateTimeField(verbose_name='Créé à')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Archived at')),
+                ('compte', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='app.compte', verbose_name='Compte')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['compte', 'created_at', 'amount'], name='archive_ledger_idx')],
+            },
+        ),
+    ]
@@ -1,66 +1,237 @@
-from datetime import datetime
+import heapq
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from operator import itemgetter
 
 from django.db import models
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.db.transaction import atomic
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
+from app.cache import invalidate_access, invalidate_comptes
+from app.fields import MoneyField, money
+
+
+def period_end(when:datetime) -> datetime:
+    """
+    Début du mois qui suit ``when`` : borne (exclue) du relevé mensuel contenant ``when``.
+    """
+    when = timezone.localtime(when)
+    year, month = (when.year + 1, 1) if when.month == 12 else (when.year, when.month + 1)
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def week_start(when:datetime) -> date:
+    """
+    Lundi de la semaine qui contient ``when`` : clé des cumuls hebdomadaires.
+    """
+    day = timezone.localtime(when).date()
+    return day - timedelta(days=day.weekday())
+
+
+class CompteQuerySet(models.query.QuerySet):
+    def with_ledger_total(self):
+        """
+        Annote chaque compte avec la somme de ses transactions (``ledger_total``).
+        """
+        ledger_total = Transaction.objects.filter(compte=OuterRef('pk')).values('compte').annotate(total=Sum('amount')).values('total')
+        return self.annotate(ledger_total=Coalesce(Subquery(ledger_total), money(0)))
+
+    def rebuild_balances(self):
+        """
+        Recalcule le solde stocké des comptes à partir du grand livre, en une seule requête.
+        """
+        ledger_total = Transaction.objects.filter(compte=OuterRef('pk')).values('compte').annotate(total=Sum('amount')).values('total')
+        invalidate_comptes(self.values_list('pk', flat=True))
+        return self.update(balance=Coalesce(Subquery(ledger_total), money(0)), version=F('version') + 1)
+
+
 class Compte(models.Model):
     # protected $fillable = ['user_id', 'manager_id', 'name', 'salary', 'total'];
     name = models.CharField(max_length=24, verbose_name=_('Name'), help_text=_('Nom du compte (ex: Prénom de l’enfant)'))
-    salary = models.FloatField(default=0, verbose_name=_('Salary'), help_text=_('Montant du salaire hebdomadaire automatique.'))
+    salary = MoneyField(default=0, db_column='salary_cents', verbose_name=_('Salary'), help_text=_('Montant du salaire hebdomadaire automatique.'))
     #total = models.FloatField(default=0)
     manager = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comptes', verbose_name=_('Manager'), help_text=_('Parent ou responsable du compte.'))
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mon_compte', verbose_name=_('Account user'), help_text=_('Enfant ou bénéficiaire du compte.'))
     last_salary_payment = models.DateTimeField(null=True, blank=True, verbose_name=_('Last salary payment'), help_text=_('Date du dernier versement automatique du salaire.'))
-    
+    next_salary_payment = models.DateTimeField(default=timezone.now, db_index=True, verbose_name=_('Next salary payment'), help_text=_('Date du prochain versement automatique du salaire.'))
+    balance = MoneyField(default=0, editable=False, db_column='balance_cents', verbose_name=_('Balance'), help_text=_('Solde du compte, mis à jour à chaque transaction.'))
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Version'), help_text=_('Incrémentée à chaque modification des transactions du compte.'))
+
+    objects = CompteQuerySet.as_manager()
+
+    # Champs tenus à jour uniquement par les opérations sur les transactions
+    LEDGER_FIELDS = ('balance', 'version')
+
     @property
     def total (self):
-        return self.transactions.get_total_amount()
+        return self.balance
+
+    def save(self, *args, **kwargs):
+        # Le solde n'est modifié que via des UPDATE atomiques (F()), une sauvegarde
+        # classique ne doit pas écraser une valeur modifiée entre-temps
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.LEDGER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        # Le nom, le salaire, le manager ou le titulaire ont pu changer
+        invalidate_comptes([self.pk])
+        invalidate_access()
+
+    def _apply_delta(self, amount, when:datetime = None, require_funds:bool = False):
+        """
+        Répercute ``amount``, écrit à la date ``when``, sur le solde stocké et les
+        relevés mensuels. Doit être appelée dans la même transaction que l'écriture
+        de la ``Transaction`` correspondante.
+
+        Avec ``require_funds``, le débit est conditionné au solde en base dans le
+        même UPDATE : ``ValueError`` si le solde ne suffit pas, rien n'est modifié.
+        """
+        comptes = Compte.objects.filter(pk=self.pk)
+        if require_funds:
+            comptes = comptes.filter(balance__gte=-amount)
+        updated = comptes.update(balance=F('balance') + money(amount), version=F('version') + 1)
+        if not updated and require_funds:
+            raise ValueError('Vous ne pouvez pas prélever plus que le total du compte')
+        invalidate_comptes([self.pk])
+        when = when or timezone.now()
+        BalanceSnapshot.objects.record([(self.pk, when, amount)])
+        WeeklyRollup.objects.record([(self.pk, when, amount)])
+        self.refresh_from_db(fields=['balance', 'version'])
+
+    def balance_at(self, when:datetime) -> Decimal:
+        """
+        Solde du compte à la date ``when`` (transactions de ``when`` incluses).
+
+        Part du dernier relevé mensuel clos avant ``when`` et n'additionne que les
+        transactions postérieures : le coût ne dépend pas de l'ancienneté du compte.
+        """
+        snapshot = self.snapshots.filter(period_end__lte=when).order_by('-period_end').values_list('period_end', 'balance').first()
+        transactions = self.transactions.filter(created_at__lte=when)
+        if snapshot is None:
+            if self._archived_carries(when):
+                # Avant la date d'un archivage (relevés supprimés, report pas
+                # encore écrit), le détail est dans les archives
+                return Decimal(transactions.get_total_amount()) + Decimal(self.archived_transactions.filter(created_at__lte=when).get_total_amount())
+            return Decimal(transactions.get_total_amount())
+        start, balance = snapshot
+        return balance + transactions.filter(created_at__gte=start).get_total_amount()
+
+    def _archived_carries(self, when:datetime) -> list:
+        """
+        Reports "Situation au ..." des compactions avec archivage postérieures à
+        ``when`` : jusqu'à ``when``, le détail des transactions est dans les archives.
+        """
+        return list(self.compactions.filter(archived=True, cutoff__gt=when).exclude(carry=None).values_list('carry_id', flat=True))
 
+    def balance_series(self, start:datetime, end:datetime, step:timedelta) -> list:
+        """
+        Solde du compte à chaque date de ``start`` à ``end`` (incluse), par pas de ``step``.
+
+        Returns
+        -------
+        Une liste de couples ``(date, solde)``.
+        """
+        balance = self.balance_at(start)
+        transactions = self.transactions.filter(created_at__gt=start, created_at__lte=end)
+        carries = self._archived_carries(start)
+        if carries:
+            # Les reports remplacent des transactions archivées, lues à leur place
+            transactions = heapq.merge(
+                transactions.exclude(pk__in=carries).order_by('created_at').values_list('created_at', 'amount').iterator(),
+                self.archived_transactions.filter(created_at__gt=start, created_at__lte=end).order_by('created_at').values_list('created_at', 'amount').iterator(),
+                key=itemgetter(0),
+            )
+        else:
+            transactions = transactions.order_by('created_at').values_list('created_at', 'amount').iterator()
+        pending = next(transactions, None)
+        series = []
+        point = start
+        while point <= end:
+            while pending is not None and pending[0] <= point:
+                balance += pending[1]
+                pending = next(transactions, None)
+            series.append((point, balance))
+            point += step
+        return series
 
-    def add_money(self, amount:float, description:str=None):
+    def ledger(self, start:datetime, end:datetime, chunk_size:int = 2000):
+        """
+        Transactions du compte de ``start`` (inclus) à ``end`` (exclu), dans
+        l'ordre chronologique et lues par paquets, archives comprises.
+
+        Returns
+        -------
+        Un itérateur de tuples ``(created_at, id, amount, description)``.
+        """
+        fields = ('created_at', 'id', 'amount', 'description')
+        transactions = self.transactions.filter(created_at__gte=start, created_at__lt=end).order_by('created_at', 'id')
+        carries = self._archived_carries(start)
+        if not carries:
+            return transactions.values_list(*fields).iterator(chunk_size=chunk_size)
+        archived = self.archived_transactions.filter(created_at__gte=start, created_at__lt=end).order_by('created_at', 'id')
+        return heapq.merge(
+            transactions.exclude(pk__in=carries).values_list(*fields).iterator(chunk_size=chunk_size),
+            archived.values_list(*fields).iterator(chunk_size=chunk_size),
+            key=itemgetter(0, 1),
+        )
+
+
+    def add_money(self, amount:Decimal, description:str=None):
         """
         Permet d'ajouter de l'argent à un compte
 
         Parameters
         ----------
-        amount: float
+        amount: Decimal
         description
         """
         if amount < 0:
             raise ValueError('Amount cannot be negative')
-        self.transactions.create(amount=amount, description=description)
+        with atomic():
+            transaction = self.transactions.create(amount=amount, description=description)
+            self._apply_delta(amount, transaction.created_at)
 
 
-    def take_money(self, amount:float, description:str=None):
+    def take_money(self, amount:Decimal, description:str=None):
         if amount < 0:
             raise ValueError('Le montant ne peut pas être négatif')
-        if amount > self.total:
-            raise ValueError('Vous ne pouvez pas prélever plus que le total du compte')
-        self.transactions.create(amount=-amount, description=description)
+        with atomic():
+            # Pas de lecture préalable du solde : deux débits simultanés ne peuvent
+            # pas tous deux le voir suffisant, le second UPDATE ne trouve plus de ligne
+            now = timezone.now()
+            self._apply_delta(-amount, now, require_funds=True)
+            self.transactions.create(amount=-amount, description=description, created_at=now)
 
 
-    def compress_transactions(self, last_day:datetime.date = None):
+    def compress_transactions(self, last_day:datetime.date = None, archive:bool = False):
+        """
+        Remplace les transactions antérieures à ``last_day`` par une transaction
+        "Situation au ...", en les déplaçant dans les archives avec ``archive``.
+        Voir ``app.compaction.compact_compte``.
+        """
+        from app.compaction import compact_compte
         if last_day is None:
-            last_day = datetime.today()
-        # on récupère les transactions plus vieilles que last_day
-        transactions = self.transactions.filter(created_at__lte=last_day)
-        # On créé une nouvelle transaction avec le montant total de ces transactions
-        compressed_transactions = Transaction(compte_id=self.id, created_at=last_day, description=f"Situation au {last_day.strftime('%d/%m/%Y')}", amount=transactions.get_total_amount())
-        compressed_transactions.save()
-        # On supprime les transactions
-        transactions.exclude(id=compressed_transactions.id).delete()
-
-    def pay_salary_if_due(self):
-        """
-        Verse le salaire si une semaine s'est écoulée depuis le dernier paiement.
-        """
-        from django.utils import timezone
-        now = timezone.now()
-        if not self.last_salary_payment or (now - self.last_salary_payment).days >= 7:
-            self.add_money(self.salary, description=_('Weekly salary payment'))
-            self.last_salary_payment = now
-            self.save()
+            last_day = timezone.now()
+        # Le solde ne change pas : la somme des transactions est conservée
+        compact_compte(self.pk, last_day, archive=archive)
+
+    def pay_salary_if_due(self, now:datetime = None) -> bool:
+        """
+        Verse le salaire si l'échéance est passée, en rattrapant les semaines manquées.
+        Voir ``app.payroll.pay_due_salaries`` pour le traitement par lots.
+        """
+        from app.payroll import pay_due_salaries
+        paid = pay_due_salaries(now=now, queryset=Compte.objects.filter(pk=self.pk))
+        if paid:
+            self.refresh_from_db(fields=['balance', 'version', 'last_salary_payment', 'next_salary_payment'])
+        return bool(paid)
 
     def __str__(self):
         return self.name
@@ -78,16 +249,258 @@ class TransactionManager(models.Manager):
 
 class Transaction(models.Model):
     # protected $fillable = ['compte_id', 'amount', 'type', 'description'];
-    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='transactions', verbose_name=_('Account'))
-    amount = models.FloatField(verbose_name=_('Amount'))
+    # L'index (compte, created_at, amount) couvre aussi les recherches par compte
+    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='transactions', db_index=False, verbose_name=_('Account'))
+    amount = MoneyField(db_column='amount_cents', verbose_name=_('Amount'))
     description = models.TextField(null=True, blank=True, verbose_name=_('Description'))
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created at'))
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_('Created at'))
 
     objects = TransactionManager()
 
+    class Meta:
+        indexes = [
+            # Index couvrant : les sommes par compte et par période se lisent dans l'index seul
+            models.Index(fields=['compte', 'created_at', 'amount'], name='transaction_ledger_idx'),
+        ]
+
     def __str__(self):
         return f"{self.compte.name} - {self.amount}"
 
 
+class ArchivedTransaction(models.Model):
+    """
+    Transaction déplacée hors du grand livre par une compaction avec archivage
+    (voir ``app.compaction``), à l'identique et sous la même clé primaire. Le
+    grand livre n'en garde que le report "Situation au ...".
+    """
+    id = models.BigIntegerField(primary_key=True)
+    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='archived_transactions', db_index=False, verbose_name=_('Account'))
+    amount = MoneyField(db_column='amount_cents', verbose_name=_('Amount'))
+    description = models.TextField(null=True, blank=True, verbose_name=_('Description'))
+    created_at = models.DateTimeField(verbose_name=_('Created at'))
+    archived_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_('Archived at'))
 
-# Create your models here.
\ No newline at end of file
+    objects = TransactionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['compte', 'created_at', 'amount'], name='archive_ledger_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.compte_id} - {self.amount}"
+
+
+class BalanceSnapshotManager(models.Manager):
+    def record(self, entries):
+        """
+        Met à jour les relevés mensuels après l'écriture de transactions.
+
+        Parameters
+        ----------
+        entries: iterable
+            Couples ``(compte_id, created_at, montant)`` des transactions écrites,
+            déjà répercutées sur le solde stocké des comptes.
+        """
+        deltas_by_period = defaultdict(lambda: defaultdict(Decimal))
+        for compte_id, when, amount in entries:
+            deltas_by_period[period_end(when)][compte_id] += Decimal(amount)
+        current_period = period_end(timezone.now())
+
+        # Du mois le plus ancien au plus récent : un relevé créé plus bas à partir du
+        # grand livre inclut déjà les transactions de ``entries`` et ne doit plus
+        # recevoir le delta des mois précédents
+        for end, deltas in sorted(deltas_by_period.items()):
+            # Les relevés de ce mois et des mois suivants incluent désormais la transaction
+            snapshots = list(self.filter(compte_id__in=deltas, period_end__gte=end).only('pk', 'compte_id', 'period_end'))
+            for snapshot in snapshots:
+                snapshot.balance = F('balance') + money(deltas[snapshot.compte_id])
+            self.bulk_update(snapshots, ['balance'])
+
+            missing = set(deltas) - {snapshot.compte_id for snapshot in snapshots if snapshot.period_end == end}
+            if not missing:
+                continue
+            if end >= current_period:
+                # Mois en cours : son relevé est le solde stocké
+                balances = dict(Compte.objects.filter(pk__in=missing).values_list('pk', 'balance'))
+            else:
+                before_end = end - timedelta(microseconds=1)
+                balances = {compte.pk: compte.balance_at(before_end) for compte in Compte.objects.filter(pk__in=missing).only('pk')}
+            self.bulk_create([
+                BalanceSnapshot(compte_id=compte_id, period_end=end, balance=balance)
+                for compte_id, balance in balances.items()
+            ])
+
+    def rebuild(self, compte_ids):
+        """
+        Recalcule entièrement les relevés mensuels des comptes à partir du grand livre.
+        """
+        self.filter(compte_id__in=compte_ids).delete()
+        monthly_totals = (
+            Transaction.objects.filter(compte_id__in=compte_ids)
+            .annotate(month=TruncMonth('created_at'))
+            .values('compte_id', 'month')
+            .annotate(total=Sum('amount'))
+            .order_by('compte_id', 'month')
+        )
+        snapshots = []
+        balances = defaultdict(Decimal)
+        for row in monthly_totals.iterator():
+            balances[row['compte_id']] += row['total']
+            snapshots.append(BalanceSnapshot(compte_id=row['compte_id'], period_end=period_end(row['month']), balance=balances[row['compte_id']]))
+        self.bulk_create(snapshots, batch_size=1000)
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Solde d'un compte à la fin d'un mois : somme des transactions antérieures à
+    ``period_end``. Les mois sans transaction n'ont pas de relevé.
+    """
+    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='snapshots', db_index=False, verbose_name=_('Account'))
+    period_end = models.DateTimeField(verbose_name=_('Period end'))
+    balance = MoneyField(db_column='balance_cents', verbose_name=_('Balance'))
+
+    objects = BalanceSnapshotManager()
+
+    class Meta:
+        constraints = [
+            # Sert aussi d'index pour retrouver le dernier relevé avant une date
+            models.UniqueConstraint(fields=['compte', 'period_end'], name='unique_snapshot_per_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.compte_id} - {self.period_end}"
+
+
+class WeeklyRollupManager(models.Manager):
+    def record(self, entries):
+        """
+        Ajoute des transactions écrites aux cumuls hebdomadaires.
+
+        Parameters
+        ----------
+        entries: iterable
+            Couples ``(compte_id, created_at, montant)`` des transactions écrites.
+        """
+        totals = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+        for compte_id, when, amount in entries:
+            amount = Decimal(amount)
+            total = totals[compte_id, week_start(when)]
+            if amount >= 0:
+                total[0] += amount
+            else:
+                total[1] -= amount
+            total[2] += 1
+        if not totals:
+            return
+
+        rollups = list(
+            self.filter(compte_id__in={compte_id for compte_id, _ in totals}, week__in={week for _, week in totals})
+            .only('pk', 'compte_id', 'week')
+        )
+        updated = []
+        for rollup in rollups:
+            key = (rollup.compte_id, rollup.week)
+            if key not in totals:
+                continue
+            credit, debit, count = totals.pop(key)
+            rollup.credit = F('credit') + money(credit)
+            rollup.debit = F('debit') + money(debit)
+            rollup.count = F('count') + count
+            updated.append(rollup)
+        self.bulk_update(updated, ['credit', 'debit', 'count'])
+        self.bulk_create([
+            WeeklyRollup(compte_id=compte_id, week=week, credit=credit, debit=debit, count=count)
+            for (compte_id, week), (credit, debit, count) in totals.items()
+        ])
+
+    def rebuild(self, compte_ids):
+        """
+        Recalcule les cumuls hebdomadaires des comptes à partir du grand livre.
+
+        Les transactions compactées sans archivage n'y sont plus : les semaines
+        jusqu'à la dernière de ces compactions (voir ``app.compaction``) gardent
+        leurs cumuls, seules les suivantes sont recalculées. Les transactions
+        archivées sont lues dans les archives, à la place de leurs reports.
+        """
+        compte_ids = list(compte_ids)
+        checkpoints = CompactionCheckpoint.objects.filter(compte_id__in=compte_ids)
+        cutoffs = dict(
+            checkpoints.filter(archived=False)
+            .values('compte_id').annotate(last=Max('cutoff')).values_list('compte_id', 'last')
+        )
+        rollups = Q(compte_id__in=[pk for pk in compte_ids if pk not in cutoffs])
+        transactions = Q(compte_id__in=[pk for pk in compte_ids if pk not in cutoffs])
+        for compte_id, cutoff in cutoffs.items():
+            # La semaine de la compaction est en partie compactée : on repart de la suivante
+            first_week = week_start(cutoff) + timedelta(days=7)
+            rollups |= Q(compte_id=compte_id, week__gte=first_week)
+            transactions |= Q(compte_id=compte_id, created_at__gte=timezone.make_aware(datetime.combine(first_week, datetime.min.time())))
+        self.filter(rollups).delete()
+
+        totals = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+        for source in (
+            Transaction.objects.filter(transactions).exclude(pk__in=checkpoints.filter(archived=True).exclude(carry=None).values('carry_id')),
+            ArchivedTransaction.objects.filter(transactions),
+        ):
+            weekly_totals = (
+                source.annotate(week=TruncWeek('created_at'))
+                .values('compte_id', 'week')
+                .annotate(credit=Sum('amount', filter=Q(amount__gte=0)), debit=Sum('amount', filter=Q(amount__lt=0)), count=Count('id'))
+                .order_by()
+            )
+            for row in weekly_totals.iterator():
+                total = totals[row['compte_id'], week_start(row['week'])]
+                total[0] += row['credit'] or 0
+                total[1] -= row['debit'] or 0
+                total[2] += row['count']
+        self.bulk_create([
+            WeeklyRollup(compte_id=compte_id, week=week, credit=credit, debit=debit, count=count)
+            for (compte_id, week), (credit, debit, count) in totals.items()
+        ], batch_size=1000)
+
+
+class WeeklyRollup(models.Model):
+    """
+    Entrées et sorties d'argent d'un compte sur une semaine (du lundi au
+    dimanche), tenues à jour à chaque écriture. Les tableaux de bord les lisent
+    au lieu de regrouper tout le grand livre.
+    """
+    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='rollups', db_index=False, verbose_name=_('Account'))
+    week = models.DateField(verbose_name=_('Week'), help_text=_('Lundi de la semaine.'))
+    credit = MoneyField(default=0, db_column='credit_cents', verbose_name=_('Money in'))
+    debit = MoneyField(default=0, db_column='debit_cents', verbose_name=_('Money out'), help_text=_('Total des débits, en positif.'))
+    count = models.PositiveIntegerField(default=0, verbose_name=_('Transactions'))
+
+    objects = WeeklyRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['compte', 'week'], name='unique_rollup_per_week'),
+        ]
+
+    def __str__(self):
+        return f"{self.compte_id} - {self.week}"
+
+
+class CompactionCheckpoint(models.Model):
+    """
+    Avancement de la compaction d'un compte jusqu'à une date donnée, pour
+    pouvoir reprendre un traitement interrompu.
+    """
+    compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='compactions', verbose_name=_('Account'))
+    cutoff = models.DateTimeField(verbose_name=_('Cutoff'))
+    # Transaction "Situation au ..." qui reçoit les montants compactés
+    carry = models.ForeignKey(Transaction, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    compacted = models.PositiveIntegerField(default=0, verbose_name=_('Compacted transactions'))
+    archived = models.BooleanField(default=False, verbose_name=_('Archived'), help_text=_('Transactions compactées conservées dans les archives.'))
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['compte', 'cutoff'], name='unique_compaction_per_cutoff'),
+        ]
+
+    def __str__(self):
+        return f"{self.compte_id} - {self.cutoff}"
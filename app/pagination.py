@@ -0,0 +1,168 @@
+"""
+Pagination par clé (keyset).
+
+Au lieu d'un OFFSET, la page suivante est désignée par un curseur : la clé de
+la dernière ligne affichée, ex: ``(created_at, id)``. La requête part de cette
+clé dans l'index, quel que soit le nombre de lignes déjà parcourues.
+"""
+import hashlib
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from app.search import RANK
+
+TRANSACTION_KEYSET = ('-created_at', '-id')
+
+CURSOR_VAR = 'cursor'
+
+# Au-delà, le nombre de résultats est affiché comme « plus de COUNT_CAP »
+COUNT_CAP = 10000
+COUNT_CACHE_TIMEOUT = 300
+
+
+def encode_cursor(obj, keyset=TRANSACTION_KEYSET) -> str:
+    """
+    Curseur désignant ``obj`` dans l'ordre ``keyset``.
+    """
+    values = (getattr(obj, field.lstrip('-')) for field in keyset)
+    return '|'.join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values)
+
+
+def decode_cursor(value:str, model, keyset=TRANSACTION_KEYSET):
+    """
+    Retourne les valeurs de clé d'un curseur, ou ``None`` s'il est invalide.
+    """
+    try:
+        parts = value.split('|')
+        if len(parts) != len(keyset):
+            return None
+        return tuple(
+            model._meta.get_field(field.lstrip('-')).to_python(part)
+            for field, part in zip(keyset, parts)
+        )
+    except (AttributeError, FieldDoesNotExist, ValidationError):
+        return None
+
+
+def after_cursor(queryset, cursor, keyset=TRANSACTION_KEYSET):
+    """
+    Filtre ``queryset`` sur les lignes qui suivent ``cursor`` dans l'ordre ``keyset``.
+    """
+    names = [field.lstrip('-') for field in keyset]
+    condition = Q()
+    for i, field in enumerate(keyset):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**dict(zip(names[:i], cursor[:i])), **{f'{names[i]}__{lookup}': cursor[i]})
+    return queryset.filter(condition)
+
+
+def estimate_count(queryset, cap:int = COUNT_CAP) -> int:
+    """
+    Nombre de lignes de ``queryset``, borné à ``cap + 1`` et mis en cache.
+
+    Le comptage s'arrête après ``cap + 1`` lignes, et le résultat est réutilisé
+    pendant ``COUNT_CACHE_TIMEOUT`` secondes pour la même requête.
+    """
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        # Filtre qui ne peut rien renvoyer (ex: ``__in`` sur une liste vide)
+        return 0
+    key = 'estimate_count:' + hashlib.md5(sql.encode()).hexdigest()
+    return cache.get_or_set(key, lambda: queryset[:cap + 1].count(), COUNT_CACHE_TIMEOUT)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Liste paginée par curseur sur ``model_admin.keyset``, sans COUNT exact.
+
+    Si l'utilisateur trie sur une colonne (``?o=``), recherche (résultats triés
+    par pertinence) ou demande tout afficher, la pagination classique par numéro
+    de page reprend la main.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor_param = request.GET.get(CURSOR_VAR)
+        self.cursor = None
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset(self):
+        if ORDER_VAR in self.params or self.show_all or self.query:
+            return None
+        return self.model_admin.keyset
+
+    @property
+    def first_page_url(self) -> str:
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self) -> str:
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    @property
+    def result_count_capped(self) -> bool:
+        return self.result_count > COUNT_CAP
+
+    @property
+    def count_cap(self) -> int:
+        return COUNT_CAP
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Un changement de filtre ou de tri repart de la première page
+        return super().get_query_string(new_params, [CURSOR_VAR, *(remove or [])])
+
+    def get_ordering(self, request, queryset):
+        if self.keyset:
+            return list(self.keyset)
+        if ORDER_VAR not in self.params and RANK in queryset.query.annotations:
+            return [RANK, '-pk']
+        return super().get_ordering(request, queryset)
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+
+        queryset = self.queryset
+        if self.cursor_param:
+            self.cursor = decode_cursor(self.cursor_param, self.model, self.keyset)
+            if self.cursor is None:
+                raise IncorrectLookupParameters
+            queryset = after_cursor(queryset, self.cursor, self.keyset)
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        results = list(queryset[:self.list_per_page + 1])
+        if len(results) > self.list_per_page:
+            results = results[:self.list_per_page]
+            self.next_cursor = encode_cursor(results[-1], self.keyset)
+
+        self.result_count = estimate_count(self.queryset)
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = results
+        self.can_show_all = False
+        # La navigation passe par les curseurs (voir keyset_pagination.html),
+        # pas par les numéros de page du paginateur
+        self.multi_page = False
+        self.paginator = None
+
+
+class KeysetPaginationMixin:
+    """
+    À combiner avec un ``ModelAdmin`` pour paginer sa liste par curseur sur ``keyset``.
+    """
+    keyset = ('-id',)
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
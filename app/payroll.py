@@ -0,0 +1,114 @@
+"""
+Versement groupé des salaires hebdomadaires.
+
+Les comptes dus sont trouvés via l'index sur ``Compte.next_salary_payment`` et
+traités par lots : une insertion groupée des transactions et une mise à jour
+groupée des comptes par lot, dans une seule transaction de base de données.
+"""
+from datetime import datetime, timedelta
+
+from django.db import OperationalError
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from app.cache import invalidate_comptes
+from app.fields import money
+from app.models import BalanceSnapshot, Compte, Transaction, WeeklyRollup
+
+SALARY_PERIOD = timedelta(days=7)
+
+
+class PayrollConflict(Exception):
+    """
+    Un autre worker a versé une partie du lot entre sa lecture et son écriture.
+    """
+
+
+def pay_due_salaries(now:datetime = None, chunk_size:int = 500, queryset=None, max_retries:int = 5) -> int:
+    """
+    Verse le salaire de tous les comptes dont l'échéance est passée.
+
+    Parameters
+    ----------
+    now: datetime
+        Date de référence, ``timezone.now()`` par défaut.
+    chunk_size: int
+        Nombre de comptes traités par transaction.
+    queryset: QuerySet
+        Restreint le versement à certains comptes (tous par défaut).
+    max_retries: int
+        Nombre de tentatives pour un lot en conflit avec un autre worker.
+
+    Returns
+    -------
+    Le nombre de comptes traités.
+    """
+    if now is None:
+        now = timezone.now()
+    if queryset is None:
+        queryset = Compte.objects.all()
+    processed = 0
+    retries = 0
+    while True:
+        try:
+            count = _pay_chunk(queryset, now, chunk_size)
+        except (PayrollConflict, OperationalError):
+            # Lot déjà (partiellement) traité ailleurs ou base verrouillée :
+            # la transaction a été annulée, on relit les comptes encore dus
+            retries += 1
+            if retries > max_retries:
+                raise
+            continue
+        if not count:
+            return processed
+        processed += count
+        retries = 0
+
+
+def _pay_chunk(queryset, now:datetime, chunk_size:int) -> int:
+    with atomic():
+        comptes = list(
+            queryset.select_for_update(skip_locked=True)
+            .filter(next_salary_payment__lte=now)
+            .order_by('next_salary_payment')
+            .only('pk', 'salary', 'next_salary_payment')[:chunk_size]
+        )
+        if not comptes:
+            return 0
+
+        transactions = []
+        # Échéance lue pour chaque compte : l'écriture n'a lieu que si elle n'a pas changé
+        read_due = [When(pk=compte.pk, then=Value(compte.next_salary_payment)) for compte in comptes]
+        for compte in comptes:
+            due = compte.next_salary_payment
+            # Chaque semaine manquée est versée une seule fois, l'échéancier reste aligné
+            weeks = (now - due) // SALARY_PERIOD + 1
+            amount = compte.salary * weeks
+            if amount:
+                description = _('Weekly salary payment')
+                if weeks > 1:
+                    description = f"{description} (x{weeks})"
+                transactions.append(Transaction(compte=compte, amount=amount, description=description))
+            compte.balance = F('balance') + money(amount)
+            compte.version = F('version') + 1
+            compte.last_salary_payment = due + (weeks - 1) * SALARY_PERIOD
+            compte.next_salary_payment = due + weeks * SALARY_PERIOD
+
+        # La mise à jour ne touche que les comptes dont l'échéance est celle qui a
+        # été lue : si un autre worker (ou un versement anticipé) l'a avancée entre
+        # temps, le nombre de lignes diffère et le lot est annulé
+        updated = Compte.objects.alias(read_due=Case(*read_due, output_field=DateTimeField())).filter(
+            next_salary_payment=F('read_due'),
+        ).bulk_update(
+            comptes, ['balance', 'version', 'last_salary_payment', 'next_salary_payment'], batch_size=chunk_size,
+        )
+        if updated != len(comptes):
+            raise PayrollConflict()
+        invalidate_comptes(compte.pk for compte in comptes)
+        Transaction.objects.bulk_create(transactions, batch_size=chunk_size)
+        entries = [(t.compte_id, t.created_at, t.amount) for t in transactions]
+        BalanceSnapshot.objects.record(entries)
+        WeeklyRollup.objects.record(entries)
+    return len(comptes)
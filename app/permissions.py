@@ -0,0 +1,77 @@
+"""
+Droits d'accès aux comptes, calculés une seule fois par requête.
+
+L'admin (et Unfold) évalue les ``has_*_permission`` de nombreuses fois pour
+afficher une seule page : on mémorise sur la requête les comptes gérés et
+possédés par l'utilisateur, obtenus avec une seule requête SQL, elle-même
+évitée tant que le cache partagé les connaît (voir ``app.cache``).
+"""
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.http.request import HttpRequest
+from django.shortcuts import get_object_or_404
+
+from app.cache import get_access
+from app.models import Compte
+
+
+@dataclass(frozen=True)
+class CompteAccess:
+    managed: frozenset
+    owned: frozenset
+
+    @property
+    def visible(self) -> frozenset:
+        return self.managed | self.owned
+
+    def can_view(self, compte_id) -> bool:
+        return _to_pk(compte_id) in self.visible
+
+    def can_manage(self, compte_id) -> bool:
+        return _to_pk(compte_id) in self.managed
+
+
+def _to_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_compte_access(request: HttpRequest) -> CompteAccess:
+    """
+    Retourne les identifiants des comptes gérés et possédés par l'utilisateur de la requête.
+    """
+    access = getattr(request, '_compte_access', None)
+    if access is None:
+        user = request.user
+        if user.is_authenticated:
+            access = get_access(user.pk, lambda: _load_access(user))
+        else:
+            access = CompteAccess(frozenset(), frozenset())
+        request._compte_access = access
+    return access
+
+
+def _load_access(user) -> CompteAccess:
+    managed, owned = set(), set()
+    rows = Compte.objects.filter(Q(manager=user) | Q(client=user)).values_list('pk', 'manager_id', 'client_id')
+    for pk, manager_id, client_id in rows:
+        if manager_id == user.pk:
+            managed.add(pk)
+        if client_id == user.pk:
+            owned.add(pk)
+    return CompteAccess(frozenset(managed), frozenset(owned))
+
+
+def get_compte(request: HttpRequest, object_id) -> Compte:
+    """
+    Charge un compte une seule fois par requête (actions de détail, permissions, ...).
+    Lève ``Http404`` si le compte n'existe pas.
+    """
+    cache = request.__dict__.setdefault('_comptes', {})
+    pk = _to_pk(object_id)
+    if pk not in cache:
+        cache[pk] = get_object_or_404(Compte, pk=pk)
+    return cache[pk]
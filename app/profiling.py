@@ -0,0 +1,209 @@
+"""
+Profilage des requêtes en production, sans ``DEBUG``.
+
+``ProfilingMiddleware`` (activé par la variable d'environnement ``PROFILING``,
+voir les settings) mesure pour chaque requête la durée totale, le nombre de
+requêtes SQL, leur durée cumulée et les plus lentes d'entre elles. Les mesures
+sont gardées dans un tampon circulaire en mémoire (``PROFILING_BUFFER_SIZE``
+dernières requêtes, propre à chaque processus) ; une fraction
+``PROFILING_SAMPLE_RATE`` est aussi ajoutée en JSON Lines au fichier
+``PROFILING_SAMPLE_FILE``.
+
+Le tableau de bord des administrateurs (``CompteAdmin.performance``) agrège le
+tampon par vue avec ``summarize``.
+"""
+import heapq
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+BUFFER_SIZE = 1000
+SLOWEST_STATEMENTS = 3
+# Longueur maximale des requêtes SQL conservées
+SQL_MAX_LENGTH = 500
+
+
+class ProfileBuffer:
+    """
+    Tampon circulaire des dernières mesures, partagé par les threads du processus.
+    """
+
+    def __init__(self, size:int):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, record:dict):
+        with self._lock:
+            self._records.append(record)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+buffer = ProfileBuffer(getattr(settings, 'PROFILING_BUFFER_SIZE', BUFFER_SIZE))
+_sample_lock = threading.Lock()
+
+
+class QueryRecorder:
+    """
+    ``execute_wrapper`` qui compte les requêtes SQL, cumule leur durée et garde
+    les ``keep`` plus lentes.
+    """
+
+    def __init__(self, keep:int = SLOWEST_STATEMENTS):
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            entry = (elapsed, self.count, sql[:SQL_MAX_LENGTH])
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self) -> list:
+        return [{'ms': round(elapsed * 1000, 3), 'sql': sql} for elapsed, _, sql in sorted(self._slowest, reverse=True)]
+
+
+def _sample(record:dict):
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    path = getattr(settings, 'PROFILING_SAMPLE_FILE', None)
+    if not path or not rate or random.random() >= rate:
+        return
+    line = json.dumps(record) + '\n'
+    with _sample_lock, open(path, 'a', encoding='utf-8') as file:
+        file.write(line)
+
+
+class ProfilingMiddleware:
+    """
+    Mesure chaque requête et l'ajoute au tampon ``buffer`` (voir le docstring du module).
+
+    Synchrone ou asynchrone selon la chaîne de middlewares : sous ASGI, les
+    vues asynchrones sont mesurées sans adaptateur. Les requêtes SQL d'une vue
+    asynchrone passent par le thread de ``sync_to_async`` propre à la requête,
+    c'est sur ses connexions que les mesures sont branchées.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self.wrap_connections(recorder):
+            response = self.get_response(request)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(self.wrap_connections)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            await sync_to_async(stack.close)()
+        # L'écriture de l'échantillon se fait hors de la boucle d'événements
+        await sync_to_async(self.record, thread_sensitive=False)(request, response, recorder, elapsed)
+        return response
+
+    @staticmethod
+    def wrap_connections(recorder:QueryRecorder) -> ExitStack:
+        """
+        Branche ``recorder`` sur les connexions du thread courant, jusqu'à la
+        fermeture de la pile renvoyée.
+        """
+        with ExitStack() as stack:
+            # Les lectures peuvent passer par le réplica (voir app.routers)
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return stack.pop_all()
+
+    def record(self, request, response, recorder:QueryRecorder, elapsed:float):
+        match = request.resolver_match
+        record = {
+            'at': time.time(),
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 3),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.total * 1000, 3),
+            'slowest': recorder.slowest,
+        }
+        buffer.append(record)
+        _sample(record)
+
+
+def percentile(values:list, p:float):
+    """
+    Percentile ``p`` (entre 0 et 100) de ``values`` déjà triées, par la méthode du rang le plus proche.
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(records:list, worst:int = 10) -> dict:
+    """
+    Agrège des mesures par vue.
+
+    Returns
+    -------
+    Un dictionnaire avec ``views`` (par vue : nombre de requêtes, p50, p95 et
+    p99 de la durée, nombre moyen et maximal de requêtes SQL, durée SQL moyenne),
+    trié de la vue la plus lente à la plus rapide au p95, et ``worst`` (les
+    ``worst`` requêtes les plus lentes).
+    """
+    by_view = defaultdict(list)
+    for record in records:
+        by_view[record['view'] or record['path']].append(record)
+    views = []
+    for view, entries in by_view.items():
+        durations = sorted(entry['ms'] for entry in entries)
+        queries = [entry['queries'] for entry in entries]
+        views.append({
+            'view': view,
+            'count': len(entries),
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'p99': percentile(durations, 99),
+            'queries_avg': round(sum(queries) / len(queries), 1),
+            'queries_max': max(queries),
+            'sql_ms_avg': round(sum(entry['sql_ms'] for entry in entries) / len(entries), 3),
+        })
+    views.sort(key=lambda view: view['p95'], reverse=True)
+    return {'views': views, 'worst': sorted(records, key=lambda record: record['ms'], reverse=True)[:worst]}
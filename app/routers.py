@@ -0,0 +1,38 @@
+"""
+Répartition des requêtes entre la connexion d'écriture et la connexion en lecture seule.
+
+``default`` écrit (WAL, transactions ``IMMEDIATE``) et ``replica`` ouvre le même
+fichier SQLite en ``mode=ro`` : grâce au WAL, les lectures (listes de l'admin,
+exports, API) ne sont bloquées ni par le versement des salaires ni par la
+compaction, et chaque processus garde sa propre connexion de lecture.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'replica'
+
+
+def _has_own_replica() -> bool:
+    # En test, l'alias de lecture est un miroir de default (même NAME) : il
+    # ne verrait pas les données non validées du test, on lit donc sur default
+    replica = connections.settings.get(READ_ALIAS)
+    return replica is not None and replica['NAME'] != connections.settings[DEFAULT_DB_ALIAS]['NAME']
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        # Dans un bloc atomic, on relit ses propres écritures et on garde les
+        # verrous pris (select_for_update) : lecture sur la connexion d'écriture
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or not _has_own_replica():
+            return DEFAULT_DB_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les deux alias désignent la même base
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,106 @@
+"""
+Recherche plein texte sur les index FTS5 (voir la migration ``0012_transaction_search``).
+
+Les tables ``app_transaction_search`` et ``app_compte_search`` ont pour ``rowid``
+la clé primaire de la ligne indexée : la recherche se traduit par un filtre
+``pk IN (SELECT rowid ... MATCH ...)`` qui conserve les filtres déjà appliqués
+au queryset (notamment le périmètre de l'utilisateur dans l'admin).
+Hors SQLite, l'admin retombe sur la recherche ``icontains`` de Django.
+"""
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+TRANSACTION_SEARCH = 'app_transaction_search'
+COMPTE_SEARCH = 'app_compte_search'
+
+# Triggers qui tiennent les index à jour dans la même transaction que l'écriture
+# d'origine : insertions, suppressions (compaction) et renommages de compte.
+# Sur SQLite, la plupart des AddField/AlterField reconstruisent la table, ce qui
+# supprime ses triggers et casse ceux des autres tables qui la lisent : une
+# migration sur ``Compte`` ou ``Transaction`` doit les supprimer puis les
+# recréer avec son propre SQL (voir ``0013_compte_version``). Le contrôle
+# ``check_search_triggers`` signale ceux qui manquent après ``migrate``.
+SEARCH_TRIGGERS = (
+    'app_transaction_search_insert',
+    'app_transaction_search_update',
+    'app_transaction_search_delete',
+    'app_compte_search_insert',
+    'app_compte_search_update',
+    'app_compte_search_delete',
+)
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs=None, databases=None, **kwargs):
+    """
+    Contrôle système (``check --database default``, lancé aussi par les tests) :
+    les six triggers des index plein texte existent.
+    """
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            existing = set(cursor.fetchall())
+        # Index pas encore créés (base non migrée)
+        if ('table', TRANSACTION_SEARCH) not in existing:
+            continue
+        for name in SEARCH_TRIGGERS:
+            if ('trigger', name) not in existing:
+                errors.append(Error(
+                    f"Trigger de recherche plein texte manquant : {name}",
+                    hint="Une migration a reconstruit app_compte ou app_transaction sans recréer les triggers.",
+                    obj=alias,
+                    id='app.E001',
+                ))
+    return errors
+
+
+# Annotation portée par les résultats, plus petite = plus pertinente (bm25)
+RANK = 'search_rank'
+
+
+def fts_query(search_term:str) -> str:
+    """
+    Traduit une saisie libre en requête FTS5 : chaque mot est cherché comme
+    préfixe, tous les mots doivent être présents. Les guillemets et opérateurs
+    saisis sont neutralisés.
+    """
+    tokens = ('"{}"*'.format(token.replace('"', '""')) for token in search_term.split())
+    return ' '.join(tokens)
+
+
+def is_available(using:str = 'default') -> bool:
+    return connections[using].vendor == 'sqlite'
+
+
+def full_text_search(queryset, table:str, search_term:str):
+    """
+    Restreint ``queryset`` aux lignes qui correspondent à ``search_term`` dans
+    ``table`` et les annote de leur score ``search_rank``.
+    """
+    query = fts_query(search_term)
+    if not query:
+        return queryset
+    row = '"{}"."{}"'.format(queryset.model._meta.db_table, queryset.model._meta.pk.column)
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (query,)),
+    ).annotate(**{
+        RANK: RawSQL(f'SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {row}', (query,)),
+    })
+
+
+class FullTextSearchMixin:
+    """
+    À combiner avec un ``ModelAdmin`` pour que sa barre de recherche utilise
+    l'index ``search_table``, les résultats étant triés par pertinence.
+    """
+    search_table = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and is_available(queryset.db):
+            return full_text_search(queryset, self.search_table, search_term), False
+        return super().get_search_results(request, queryset, search_term)
@@ -0,0 +1,97 @@
+"""
+Génération de données de test pour le grand livre.
+
+``seed_ledger`` crée des utilisateurs, des comptes et des transactions à partir
+d'une graine : deux appels avec les mêmes paramètres produisent les mêmes
+données. Les transactions suivent une loi de Zipf (quelques comptes très
+actifs, beaucoup de comptes presque vides), comme en production.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.models import User
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from app.cache import invalidate_access
+from app.models import BalanceSnapshot, Compte, Transaction, WeeklyRollup
+
+SALARIES = [Decimal(value) for value in ('0', '0', '1', '2.50', '5', '10')]
+DESCRIPTIONS = ['Argent de poche', 'Bonbons', 'Cinéma', 'Livre', 'Cadeau', 'Jeu vidéo', 'Tirelire', None]
+
+
+def seed_ledger(users:int, comptes:int, transactions:int, seed:int = 0, until:datetime = None,
+                days:int = 365, skew:float = 1.1, prefix:str = 'seed', batch_size:int = 5000) -> list:
+    """
+    Crée ``users`` utilisateurs, ``comptes`` comptes et ``transactions`` transactions.
+
+    Parameters
+    ----------
+    seed: int
+        Graine du générateur pseudo-aléatoire.
+    until: datetime
+        Date de la transaction la plus récente possible, minuit du jour par défaut.
+        À fixer pour obtenir les mêmes dates d'un jour à l'autre.
+    days: int
+        Les transactions sont réparties sur les ``days`` jours qui précèdent ``until``.
+    skew: float
+        Exposant de la loi de Zipf : le compte de rang ``k`` reçoit une part
+        proportionnelle à ``1 / k ** skew`` des transactions (0 : répartition uniforme).
+    prefix: str
+        Préfixe des noms d'utilisateur, qui doivent être libres.
+
+    Returns
+    -------
+    La liste des identifiants des comptes créés, du plus actif au moins actif.
+    """
+    if users < 1 or comptes < 1:
+        raise ValueError("Il faut au moins un utilisateur et un compte")
+    rng = random.Random(seed)
+    if until is None:
+        until = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+    start = until - timedelta(days=days)
+
+    with atomic():
+        people = User.objects.bulk_create([
+            User(username=f'{prefix}{i:06d}', password=UNUSABLE_PASSWORD_PREFIX, is_staff=True, date_joined=start)
+            for i in range(users)
+        ], batch_size=batch_size)
+        accounts = Compte.objects.bulk_create([
+            Compte(
+                name=f'Compte {i}', client=people[i % users], manager=people[rng.randrange(users)],
+                salary=rng.choice(SALARIES),
+                next_salary_payment=until - timedelta(days=rng.randrange(14)),
+            )
+            for i in range(comptes)
+        ], batch_size=batch_size)
+        invalidate_access()
+    compte_ids = [compte.pk for compte in accounts]
+
+    cum_weights = list(accumulate(1 / (rank + 1) ** skew for rank in range(comptes)))
+    seconds = days * 86400
+    remaining = transactions
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        remaining -= count
+        with atomic():
+            Transaction.objects.bulk_create([
+                Transaction(
+                    compte_id=compte_id,
+                    # Surtout des crédits, des débits plus petits : les soldes restent positifs
+                    amount=Decimal(rng.randrange(100, 2000)) / 100 if rng.random() < 0.7 else Decimal(-rng.randrange(50, 1000)) / 100,
+                    description=rng.choice(DESCRIPTIONS),
+                    created_at=start + timedelta(seconds=rng.randrange(seconds)),
+                )
+                for compte_id in rng.choices(compte_ids, cum_weights=cum_weights, k=count)
+            ])
+
+    for offset in range(0, comptes, batch_size):
+        chunk = compte_ids[offset:offset + batch_size]
+        with atomic():
+            Compte.objects.filter(pk__in=chunk).rebuild_balances()
+            BalanceSnapshot.objects.rebuild(chunk)
+            WeeklyRollup.objects.rebuild(chunk)
+    return compte_ids
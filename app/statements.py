@@ -0,0 +1,150 @@
+"""
+Relevés mensuels des comptes, en HTML et en CSV.
+
+Un relevé par compte actif dans le mois : solde d'ouverture, transactions du
+mois avec le solde après chacune, solde de clôture. Les comptes sont répartis
+sur un pool de processus (voir ``app.workers``), chaque processus lit les
+transactions de son compte par paquets (``Compte.ledger``).
+
+Chaque fichier est écrit sous un nom temporaire puis renommé : un relevé
+présent est complet, une génération interrompue reprend avec les comptes
+restants.
+"""
+import csv
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from app.models import ArchivedTransaction, Compte, Transaction, period_end
+
+# Colonnes du relevé CSV
+STATEMENT_FIELDS = ('date', 'description', 'montant', 'solde')
+
+CHUNK_SIZE = 2000
+
+
+def month_bounds(month:date) -> tuple:
+    """
+    Début (inclus) et fin (exclue) du mois contenant ``month``.
+    """
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    return start, period_end(start)
+
+
+def active_comptes(month:date) -> list:
+    """
+    Identifiants des comptes ayant au moins une transaction dans le mois.
+    """
+    start, end = month_bounds(month)
+    compte_ids = set()
+    for model in (Transaction, ArchivedTransaction):
+        compte_ids.update(
+            model.objects.filter(created_at__gte=start, created_at__lt=end).values_list('compte_id', flat=True).distinct()
+        )
+    return sorted(compte_ids)
+
+
+def statement_paths(directory:Path, month:date, compte_id:int) -> tuple:
+    """
+    Chemins du relevé HTML et du relevé CSV d'un compte.
+    """
+    base = Path(directory) / month.strftime('%Y-%m') / f"compte-{compte_id}"
+    return base.with_suffix('.html'), base.with_suffix('.csv')
+
+
+def is_done(directory:Path, month:date, compte_id:int) -> bool:
+    return all(path.exists() for path in statement_paths(directory, month, compte_id))
+
+
+def write_statement(compte_id:int, month:date, directory:Path, force:bool = False) -> bool:
+    """
+    Écrit le relevé du mois d'un compte.
+
+    Returns
+    -------
+    ``False`` si le relevé existait déjà (et ``force`` est faux), ``True`` sinon.
+    """
+    if not force and is_done(directory, month, compte_id):
+        return False
+    compte = Compte.objects.select_related('manager', 'client').get(pk=compte_id)
+    start, end = month_bounds(month)
+    opening = compte.balance_at(start - timedelta(microseconds=1))
+    html_path, csv_path = statement_paths(directory, month, compte_id)
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+
+    balance = opening
+    credit = debit = Decimal(0)
+    lines = []
+    csv_tmp = csv_path.with_name(csv_path.name + '.tmp')
+    with csv_tmp.open('w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(STATEMENT_FIELDS)
+        writer.writerow([start.date().isoformat(), "Solde d'ouverture", '', opening])
+        for created_at, _, amount, description in compte.ledger(start, end, chunk_size=CHUNK_SIZE):
+            balance += amount
+            if amount >= 0:
+                credit += amount
+            else:
+                debit -= amount
+            created_at = timezone.localtime(created_at)
+            writer.writerow([created_at.isoformat(), description or '', amount, balance])
+            lines.append({'created_at': created_at, 'description': description, 'amount': amount, 'balance': balance})
+        writer.writerow([(end - timedelta(days=1)).date().isoformat(), "Solde de clôture", '', balance])
+    os.replace(csv_tmp, csv_path)
+
+    html = render_to_string('statements/statement.html', {
+        'compte': compte,
+        'month': start,
+        'opening': opening,
+        'closing': balance,
+        'credit': credit,
+        'debit': debit,
+        'lines': lines,
+        'generated_at': timezone.localtime(),
+    })
+    # Le relevé HTML est écrit en dernier : sa présence marque le compte comme traité
+    html_tmp = html_path.with_name(html_path.name + '.tmp')
+    html_tmp.write_text(html, encoding='utf-8')
+    os.replace(html_tmp, html_path)
+    return True
+
+
+def generate_statements(month:date, directory:Path, workers:int = 1, force:bool = False, compte_ids=None) -> tuple:
+    """
+    Écrit les relevés du mois de tous les comptes actifs, en répartissant les
+    comptes sur ``workers`` processus.
+
+    Parameters
+    ----------
+    compte_ids: list
+        Restreint la génération à ces comptes (tous les comptes actifs par défaut).
+    force: bool
+        Réécrit les relevés déjà présents.
+
+    Returns
+    -------
+    Un couple ``(relevés écrits, relevés déjà présents)``.
+    """
+    todo = active_comptes(month)
+    if compte_ids is not None:
+        compte_ids = set(compte_ids)
+        todo = [pk for pk in todo if pk in compte_ids]
+    if not force:
+        pending = [pk for pk in todo if not is_done(directory, month, pk)]
+    else:
+        pending = todo
+    skipped = len(todo) - len(pending)
+    if workers <= 1 or len(pending) <= 1:
+        written = sum(write_statement(pk, month, directory, force) for pk in pending)
+        return written, skipped
+    from app.workers import map_in_processes
+    written = sum(map_in_processes(
+        'app.statements.write_statement', pending, workers,
+        chunksize=max(1, min(64, len(pending) // (workers * 4))),
+        month=month, directory=directory, force=force,
+    ))
+    return written, skipped
@@ -0,0 +1,199 @@
+"""
+Fichiers statiques : noms avec empreinte du contenu, copies compressées et
+cache navigateur illimité.
+
+``collectstatic`` écrit dans ``STATIC_ROOT`` chaque fichier sous son nom
+d'origine et sous un nom avec empreinte (``style.3f2a1c9b04de.css``, voir le
+manifeste ``staticfiles.json``), plus une copie ``.gz`` de ceux qui se
+compressent. ``{% static %}`` renvoie le nom avec empreinte : le contenu d'une
+URL ne change jamais, le navigateur la garde un an sans revalider.
+
+``StaticFilesMiddleware`` sert ``STATIC_ROOT`` quand aucun proxy ne s'en charge
+(voir ``deploy/nginx.conf`` pour le même comportement derrière nginx).
+"""
+import gzip
+import mimetypes
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf', '.eot'}
+# En dessous, l'en-tête gzip coûte plus qu'il ne rapporte
+MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Noms sans empreinte : leur contenu change à chaque déploiement
+SHORT_LIVED = 'public, max-age=60'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ``ManifestStaticFilesStorage`` qui écrit aussi une copie ``.gz`` de chaque
+    fichier compressible, et sert les noms d'origine tant qu'il n'y a pas de
+    manifeste (``collectstatic`` pas encore lancé : développement, tests).
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            for target in {name, hashed_name} - {None}:
+                self._compress(target)
+
+    def _compress(self, name:str):
+        if Path(name).suffix.lower() not in COMPRESSIBLE or not self.exists(name):
+            return
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_SIZE:
+            return
+        # mtime=0 : la même entrée donne toujours le même fichier
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content) * 0.95:
+            return
+        if self.exists(name + '.gz'):
+            self.delete(name + '.gz')
+        self._save(name + '.gz', ContentFile(compressed))
+
+
+def accepts_gzip(header:str) -> bool:
+    """
+    ``True`` si l'en-tête ``Accept-Encoding`` accepte gzip : cité avec une
+    qualité non nulle, ou couvert par ``*`` sans être refusé (``gzip;q=0``).
+    """
+    qualities = {}
+    for coding in header.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    if 'gzip' in qualities:
+        return qualities['gzip'] > 0
+    return qualities.get('*', 0) > 0
+
+
+class StaticFilesMiddleware:
+    """
+    Sert les fichiers de ``STATIC_ROOT`` avant le reste de l'application :
+    version ``.gz`` si le client l'accepte, cache d'un an pour les noms avec
+    empreinte, revalidation (``If-Modified-Since``) pour les autres.
+
+    Synchrone ou asynchrone selon la chaîne de middlewares : sous ASGI, les
+    vues asynchrones (``app.live``) ne passent pas par un adaptateur.
+
+    Désactivé tant que ``collectstatic`` n'a pas rempli ``STATIC_ROOT``
+    (``runserver`` sert alors les fichiers sources avec ``DEBUG``).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = Path(settings.STATIC_ROOT).resolve() if settings.STATIC_ROOT else None
+        if self.root is None or not self.root.is_dir():
+            raise MiddlewareNotUsed
+        self.prefix = settings.STATIC_URL
+        # (date de modification du manifeste, noms avec empreinte)
+        self._manifest = (None, frozenset())
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        found = self.find(request)
+        if found is None:
+            return self.get_response(request)
+        return self.serve(request, *found)
+
+    async def __acall__(self, request):
+        found = self.find(request)
+        if found is None:
+            return await self.get_response(request)
+        response = await sync_to_async(self.serve, thread_sensitive=False)(request, *found)
+        if response.streaming and not response.is_async:
+            # Le fichier est lu morceau par morceau, hors de la boucle d'événements
+            chunks = iter(response.streaming_content)
+            read = sync_to_async(next, thread_sensitive=False)
+
+            async def content():
+                while (chunk := await read(chunks, None)) is not None:
+                    yield chunk
+            response.streaming_content = content()
+        return response
+
+    def find(self, request):
+        """
+        Nom et chemin du fichier demandé, ``None`` si la requête n'en vise pas un.
+        """
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        name = request.path_info[len(self.prefix):]
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+        return name, path
+
+    def is_immutable(self, name:str) -> bool:
+        """
+        ``True`` si ``name`` est un nom avec empreinte du manifeste. Le manifeste
+        est relu quand un ``collectstatic`` l'a réécrit, sans redémarrage.
+        """
+        manifest_name = getattr(staticfiles_storage, 'manifest_name', None)
+        if manifest_name is None:
+            return False
+        try:
+            mtime = (self.root / manifest_name).stat().st_mtime
+        except FileNotFoundError:
+            return False
+        loaded_mtime, names = self._manifest
+        if mtime != loaded_mtime:
+            # Les gabarits ({% static %}) pointent eux aussi vers les nouveaux fichiers
+            staticfiles_storage.hashed_files, staticfiles_storage.manifest_hash = staticfiles_storage.load_manifest()
+            names = frozenset(staticfiles_storage.hashed_files.values())
+            self._manifest = (mtime, names)
+        return name in names
+
+    def serve(self, request, name:str, path:Path):
+        stat = path.stat()
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            return HttpResponseNotModified()
+
+        content_type, encoding = mimetypes.guess_type(name)
+        compressed = path.with_name(path.name + '.gz')
+        has_gzip = encoding is None and compressed.is_file()
+        source = compressed if has_gzip and accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')) else path
+
+        response = FileResponse(source.open('rb'), content_type=content_type or 'application/octet-stream')
+        # FileResponse le déduit du nom du fichier ouvert, inutile ici
+        del response['Content-Disposition']
+        if source is compressed:
+            response['Content-Encoding'] = 'gzip'
+        if has_gzip:
+            response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = IMMUTABLE if self.is_immutable(name) else SHORT_LIVED
+        return response
@@ -1,3 +1,1269 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F, QuerySet
+from django.db.transaction import atomic
+from django.http import FileResponse
+from django.test import SimpleTestCase, TestCase as BaseTestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import profiling
+from app.admin import TransactionAdminForm
+from app.benchmarks import CASES as BENCH_CASES, run_benchmarks
+from app.cache import stats as cache_stats
+from app.compaction import as_cutoff, compact_compte
+from app.management.commands.import_transactions import Command as ImportCommand
+from app.events import CacheBroker, channel, publish_balances
+from app.models import BalanceSnapshot, CompactionCheckpoint, Compte, Transaction, WeeklyRollup, period_end
+from app.pagination import estimate_count
+from app.payroll import SALARY_PERIOD, PayrollConflict, pay_due_salaries
+from app.routers import ReadReplicaRouter
+from app.search import check_search_triggers
+from app.seeding import seed_ledger
+from app.staticfiles import StaticFilesMiddleware
+
+
+class TestCase(BaseTestCase):
+    """
+    Le cache partagé (résumés, droits d'accès, comptages) survit aux rollbacks
+    entre les tests : on le vide avant chacun.
+    """
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        cache.clear()
+
+
+class CompteBalanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+
+    def setUp(self):
+        self.compte = Compte.objects.create(name='Enfant', salary=5, manager=self.parent, client=self.child)
+
+    def test_add_and_take_money_update_stored_balance(self):
+        self.compte.add_money(10)
+        self.compte.take_money(4)
+        self.assertEqual(self.compte.total, 6)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 6)
+
+    def test_amounts_are_exact_cents(self):
+        for _ in range(10):
+            self.compte.add_money(0.1)
+        self.compte.take_money(Decimal('0.30'))
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, Decimal('0.70'))
+        self.assertEqual(self.compte.transactions.get_total_amount(), Decimal('0.70'))
+        self.assertEqual(Transaction.objects.values_list('amount', flat=True).first(), Decimal('0.10'))
+
+    def test_take_money_refuses_overdraft(self):
+        self.compte.add_money(3)
+        with self.assertRaises(ValueError):
+            self.compte.take_money(5)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 3)
+        self.assertEqual(self.compte.transactions.count(), 1)
+
+    def test_debit_is_checked_against_the_stored_balance(self):
+        self.compte.add_money(10)
+        # Deux processus qui ont chacun lu un solde de 10
+        first, second = Compte.objects.get(pk=self.compte.pk), Compte.objects.get(pk=self.compte.pk)
+        first.take_money(8)
+        with self.assertRaises(ValueError):
+            second.take_money(8)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 2)
+        self.assertEqual(self.compte.transactions.count(), 2)
+
+    def test_admin_transaction_refuses_overdraft(self):
+        self.compte.add_money(3)
+        self.client.force_login(User.objects.create_superuser('admin'))
+        url = reverse('admin:app_transaction_add')
+        response = self.client.post(url, {'compte': self.compte.pk, 'amount': '-5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['adminform'].form, 'amount', 'Vous ne pouvez pas prélever plus que le total du compte')
+
+        # Le solde a baissé entre la validation du formulaire et l'écriture
+        with mock.patch.object(TransactionAdminForm, 'clean', lambda form: form.cleaned_data):
+            response = self.client.post(url, {'compte': self.compte.pk, 'amount': '-5'})
+        self.assertRedirects(response, url)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 3)
+        self.assertEqual(self.compte.transactions.count(), 1)
+
+        self.client.post(url, {'compte': self.compte.pk, 'amount': '-2'})
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 1)
+
+    def test_stress_debits_refuses_an_existing_account_without_force(self):
+        self.compte.add_money(10)
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('stress_debits', '--compte', str(self.compte.pk), '--threads', '1', '--debits', '1', stdout=StringIO())
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 10)
+        self.assertEqual(self.compte.transactions.count(), 1)
+
+    def test_total_does_not_query_the_ledger(self):
+        self.compte.add_money(10)
+        compte = Compte.objects.get(pk=self.compte.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(compte.total, 10)
+
+    def test_compress_transactions_keeps_balance(self):
+        for amount in (1, 2, 3):
+            self.compte.add_money(amount)
+        self.compte.compress_transactions()
+        self.assertEqual(self.compte.transactions.count(), 1)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 6)
+
+    def test_save_does_not_overwrite_balance(self):
+        stale = Compte.objects.get(pk=self.compte.pk)
+        self.compte.add_money(10)
+        stale.name = 'Renommé'
+        stale.save()
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 10)
+
+    def test_check_balances_rebuilds_drifted_balance(self):
+        self.compte.add_money(10)
+        Transaction.objects.create(compte=self.compte, amount=5)
+        out = StringIO()
+        call_command('check_balances', '--dry-run', stdout=out)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 10)
+        call_command('check_balances', stdout=out)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 15)
+
+
+class PayrollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+
+    def test_pays_due_accounts_and_catches_up_missed_weeks_once(self):
+        now = timezone.now()
+        late = Compte.objects.create(name='Retard', salary=5, manager=self.parent, client=self.child, next_salary_payment=now - timedelta(days=15))
+        later = Compte.objects.create(name='Futur', salary=5, manager=self.parent, client=self.child, next_salary_payment=now + timedelta(days=1))
+
+        self.assertEqual(pay_due_salaries(now=now, chunk_size=1), 1)
+        self.assertEqual(pay_due_salaries(now=now), 0)
+
+        late.refresh_from_db()
+        self.assertEqual(late.balance, 15)
+        self.assertEqual(late.transactions.count(), 1)
+        self.assertGreater(late.next_salary_payment, now)
+        self.assertEqual(later.transactions.count(), 0)
+
+    def test_schedule_advanced_after_reading_is_a_conflict(self):
+        now = timezone.now()
+        compte = Compte.objects.create(name='Retard', salary=5, manager=self.parent, client=self.child, next_salary_payment=now - timedelta(days=15))
+        bulk_update = QuerySet.bulk_update
+
+        def concurrent_bulk_update(queryset, objs, fields, **kwargs):
+            # Un autre worker avance l'échéance d'une semaine, toujours passée
+            Compte.objects.filter(pk=compte.pk).update(next_salary_payment=F('next_salary_payment') + SALARY_PERIOD)
+            return bulk_update(queryset, objs, fields, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_update', concurrent_bulk_update), self.assertRaises(PayrollConflict):
+            pay_due_salaries(now=now, max_retries=0)
+        compte.refresh_from_db()
+        self.assertEqual(compte.balance, 0)
+        self.assertEqual(compte.transactions.count(), 0)
+
+    def test_pay_salary_if_due(self):
+        compte = Compte.objects.create(name='Enfant', salary=5, manager=self.parent, client=self.child)
+        self.assertTrue(compte.pay_salary_if_due())
+        self.assertFalse(compte.pay_salary_if_due())
+        self.assertEqual(compte.total, 5)
+        self.assertIsNotNone(compte.last_salary_payment)
+
+
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.rich = Compte.objects.create(name='Riche', salary=3, manager=cls.parent, client=User.objects.create_user('riche'))
+        cls.poor = Compte.objects.create(name='Pauvre', manager=cls.parent, client=User.objects.create_user('pauvre'))
+        # Compte du parent lui-même, géré par quelqu'un d'autre : visible mais pas modifiable
+        cls.other = Compte.objects.create(name='Autre', salary=3, manager=User.objects.create_user('autre', is_staff=True), client=cls.parent)
+        cls.rich.add_money(20)
+        cls.poor.add_money(2)
+        cls.other.add_money(20)
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def _run(self, action, amount='5'):
+        data = {'action': action, '_selected_action': [self.rich.pk, self.poor.pk, self.other.pk], 'amount': amount, 'index': '0'}
+        response = self.client.post(reverse('admin:app_compte_changelist'), data, follow=True)
+        return [str(message) for message in response.context['messages']]
+
+    def _balances(self):
+        return dict(Compte.objects.values_list('name', 'balance'))
+
+    def test_debit_reports_failures_in_aggregate(self):
+        messages = self._run('debit_selected')
+        self.assertEqual(self._balances(), {'Riche': 15, 'Pauvre': 2, 'Autre': 20})
+        self.assertIn('1 compte(s) débité(s) de 5€', messages)
+        self.assertTrue(any('Pauvre' in message and 'plus que le total' in message for message in messages))
+        self.assertTrue(any('Autre' in message and 'gérez pas' in message for message in messages))
+        self.assertEqual(self.rich.transactions.get_total_amount(), 15)
+        self.assertEqual(WeeklyRollup.objects.get(compte=self.rich).debit, 5)
+        self.assertEqual(self.rich.balance_at(timezone.now()), 15)
+
+    def test_credit_and_salary(self):
+        self._run('credit_selected', '1.50')
+        self.assertEqual(self._balances(), {'Riche': Decimal('21.50'), 'Pauvre': Decimal('3.50'), 'Autre': 20})
+        next_payment = Compte.objects.get(pk=self.rich.pk).next_salary_payment
+        messages = self._run('pay_salary_selected')
+        self.assertEqual(self._balances()['Riche'], Decimal('24.50'))
+        self.assertTrue(any('Pauvre' in message and 'Pas de salaire' in message for message in messages))
+        rich = Compte.objects.get(pk=self.rich.pk)
+        self.assertEqual(rich.last_salary_payment, next_payment)
+        self.assertEqual(rich.next_salary_payment, next_payment + timedelta(days=7))
+        self.assertEqual(rich.transactions.get_total_amount(), rich.balance)
+
+    def test_amount_is_required(self):
+        messages = self._run('credit_selected', '')
+        self.assertTrue(any('montant' in message for message in messages))
+        self.assertEqual(self._balances(), {'Riche': 20, 'Pauvre': 2, 'Autre': 20})
+
+
+class AdminQueryBudgetTests(TestCase):
+    """
+    Chaque page de l'admin doit exécuter un nombre de requêtes borné,
+    indépendant du nombre de comptes et de transactions.
+    """
+    budgets = {
+        'compte_changelist': 7,
+        'compte_change': 11,
+        'transaction_changelist': 7,
+        'add_money_form': 6,
+        'add_money_post': 13,
+        'take_money_post': 13,
+        'bulk_credit_post': 15,
+        'bulk_debit_post': 15,
+        'bulk_salary_post': 16,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.compte = cls._seed(10)
+
+    @classmethod
+    def _seed(cls, count):
+        start = Compte.objects.count()
+        for i in range(start, start + count):
+            child = User.objects.create_user(f'enfant{i}', is_staff=True)
+            compte = Compte.objects.create(name=f'Enfant {i}', salary=5, manager=cls.parent, client=child)
+            for amount in (10, 5, 2):
+                compte.add_money(amount)
+        return compte
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def _count_queries(self, method, url, data=None):
+        # On mesure le chemin sans cache (comptage estimé des listes)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        self.assertIn(response.status_code, (200, 302))
+        return len(context)
+
+    def assertQueryBudget(self, name, method, url, data=None):
+        # Premier appel pour remplir les caches de processus (ContentType, ...)
+        self._count_queries(method, url, data)
+        small = self._count_queries(method, url, data)
+        self._seed(30)
+        large = self._count_queries(method, url, data)
+        self.assertLessEqual(small, self.budgets[name])
+        self.assertEqual(small, large, f"{name} : le nombre de requêtes dépend du volume de données")
+
+    def test_compte_changelist(self):
+        self.assertQueryBudget('compte_changelist', 'get', reverse('admin:app_compte_changelist'))
+
+    def test_compte_change_page_with_inline(self):
+        url = reverse('admin:app_compte_change', args=[self.compte.pk])
+        self.assertContains(self.client.get(url), 'transactions-TOTAL_FORMS')
+        self.assertQueryBudget('compte_change', 'get', url)
+
+    def test_compte_change_page_fetches_compte_once(self):
+        url = reverse('admin:app_compte_change', args=[self.compte.pk])
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        compte_fetches = [q for q in context.captured_queries if q['sql'].startswith('SELECT "app_compte"."id", "app_compte"."name"')]
+        self.assertEqual(len(compte_fetches), 1)
+
+    def test_transaction_changelist(self):
+        self.assertQueryBudget('transaction_changelist', 'get', reverse('admin:app_transaction_changelist'))
+
+    def test_add_money_form(self):
+        self.assertQueryBudget('add_money_form', 'get', reverse('admin:app_compte_add_money', args=[self.compte.pk]))
+
+    def test_add_money_action(self):
+        self.assertQueryBudget('add_money_post', 'post', reverse('admin:app_compte_add_money', args=[self.compte.pk]), {'amount': '1'})
+
+    def test_take_money_action(self):
+        self.assertQueryBudget('take_money_post', 'post', reverse('admin:app_compte_take_money', args=[self.compte.pk]), {'amount': '1'})
+
+    def test_bulk_actions(self):
+        # Tous les comptes de la liste, quel que soit leur nombre
+        for name, action in (('bulk_credit_post', 'credit_selected'), ('bulk_debit_post', 'debit_selected'), ('bulk_salary_post', 'pay_salary_selected')):
+            data = {'action': action, 'select_across': '1', '_selected_action': [self.compte.pk], 'amount': '1', 'index': '0'}
+            with self.subTest(action):
+                self.assertQueryBudget(name, 'post', reverse('admin:app_compte_changelist'), data)
+
+
+class CompactionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+
+    def setUp(self):
+        self.compte = Compte.objects.create(name='Enfant', manager=self.parent, client=self.child)
+        self.cutoff = timezone.now() - timedelta(days=30)
+        for days in (60, 50, 40, 35, 10):
+            self.compte.add_money(days)
+        # On date les transactions a posteriori pour simuler un historique
+        for transaction, days in zip(self.compte.transactions.order_by('id'), (60, 50, 40, 35, 10)):
+            Transaction.objects.filter(pk=transaction.pk).update(created_at=timezone.now() - timedelta(days=days))
+
+    def test_compacts_in_chunks_and_keeps_balance(self):
+        removed = compact_compte(self.compte.pk, self.cutoff, chunk_size=2)
+        self.assertEqual(removed, 4)
+        carry, recent = self.compte.transactions.order_by('created_at')
+        self.assertEqual(carry.amount, 185)
+        self.assertEqual(carry.created_at, self.cutoff)
+        self.assertEqual(recent.amount, 10)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 195)
+
+        checkpoint = CompactionCheckpoint.objects.get(compte=self.compte)
+        self.assertEqual(checkpoint.compacted, 4)
+        self.assertIsNotNone(checkpoint.completed_at)
+        self.assertEqual(compact_compte(self.compte.pk, self.cutoff), 0)
+
+    def test_resumes_an_interrupted_run(self):
+        carry = Transaction.objects.create(compte=self.compte, amount=60, created_at=self.cutoff)
+        Transaction.objects.filter(compte=self.compte, amount=60).exclude(pk=carry.pk).delete()
+        CompactionCheckpoint.objects.create(compte=self.compte, cutoff=self.cutoff, carry=carry, compacted=1)
+
+        self.assertEqual(compact_compte(self.compte.pk, self.cutoff, chunk_size=1), 3)
+        self.assertEqual(Transaction.objects.get(pk=carry.pk).amount, 185)
+        self.assertEqual(CompactionCheckpoint.objects.get(compte=self.compte).compacted, 4)
+
+    def test_command_sweeps_all_accounts(self):
+        call_command('compact_transactions', '--before', timezone.localdate().isoformat(), stdout=StringIO())
+        self.assertEqual(self.compte.transactions.count(), 1)
+        self.assertEqual(self.compte.transactions.get().amount, 195)
+
+    def test_command_includes_the_cutoff_day(self):
+        day = timezone.localdate(timezone.now() - timedelta(days=35))
+        call_command('compact_transactions', '--before', day.isoformat(), stdout=StringIO())
+        carry, recent = self.compte.transactions.order_by('created_at')
+        self.assertEqual(carry.amount, 185)
+        self.assertEqual(carry.created_at, as_cutoff(day))
+        self.assertEqual(recent.amount, 10)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+
+    def setUp(self):
+        self.compte = Compte.objects.create(name='Enfant', manager=self.parent, client=self.child)
+        self.now = timezone.now()
+        for days, amount in ((60, 40), (50, -15), (40, 30), (35, -5), (10, 7)):
+            Transaction.objects.create(compte=self.compte, amount=amount, description=f'J-{days}', created_at=self.now - timedelta(days=days))
+        Compte.objects.all().rebuild_balances()
+        BalanceSnapshot.objects.rebuild([self.compte.pk])
+        WeeklyRollup.objects.rebuild([self.compte.pk])
+        self.history = [
+            self.compte.balance_at(self.now - timedelta(days=days, hours=-1)) for days in (60, 50, 40, 35, 10)
+        ]
+
+    def _archive(self, days, **kwargs):
+        return compact_compte(self.compte.pk, self.now - timedelta(days=days), archive=True, **kwargs)
+
+    def test_moves_transactions_to_the_archive(self):
+        self.assertEqual(self._archive(30, chunk_size=3), 4)
+        carry, recent = self.compte.transactions.order_by('created_at')
+        self.assertEqual(carry.amount, 50)
+        self.assertEqual(recent.amount, 7)
+        self.assertEqual(
+            list(self.compte.archived_transactions.order_by('created_at').values_list('amount', 'description')),
+            [(40, 'J-60'), (-15, 'J-50'), (30, 'J-40'), (-5, 'J-35')],
+        )
+        self.assertTrue(CompactionCheckpoint.objects.get(compte=self.compte).archived)
+        self.assertEqual(Compte.objects.get(pk=self.compte.pk).balance, 57)
+
+    def test_history_reads_the_archive(self):
+        self._archive(45)
+        # Un second archivage ne recopie pas le report du premier, et une
+        # compaction simple d'un compte archivé archive aussi
+        compact_compte(self.compte.pk, self.now - timedelta(days=20))
+        self.assertEqual(self.compte.archived_transactions.count(), 4)
+        self.assertEqual(self.compte.transactions.count(), 2)
+        self.assertEqual(
+            [self.compte.balance_at(self.now - timedelta(days=days, hours=-1)) for days in (60, 50, 40, 35, 10)],
+            self.history,
+        )
+        series = self.compte.balance_series(self.now - timedelta(days=55), self.now, timedelta(days=10))
+        self.assertEqual([balance for _, balance in series], [40, 25, 50, 50, 50, 57])
+
+    def test_exports_and_rollups_read_the_archive(self):
+        rollups = sorted(WeeklyRollup.objects.values_list('week', 'credit', 'debit', 'count'))
+        self._archive(30)
+        self.client.force_login(self.parent)
+        response = self.client.get(reverse('admin:app_compte_export_transactions_jsonl', args=[self.compte.pk]))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['amount'] for row in rows], ['40.00', '-15.00', '30.00', '-5.00', '7.00'])
+        WeeklyRollup.objects.rebuild([self.compte.pk])
+        self.assertEqual(sorted(WeeklyRollup.objects.values_list('week', 'credit', 'debit', 'count')), rollups)
+
+
+class BalanceSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+
+    def setUp(self):
+        self.compte = Compte.objects.create(name='Enfant', manager=self.parent, client=self.child)
+        self.start = timezone.make_aware(datetime(2025, 1, 15))
+
+    def _write(self, amount, when):
+        with atomic():
+            transaction = Transaction.objects.create(compte=self.compte, amount=amount, created_at=when)
+            self.compte._apply_delta(amount, transaction.created_at)
+
+    def _ledger_balance(self, when):
+        return self.compte.transactions.filter(created_at__lte=when).get_total_amount()
+
+    def test_add_money_keeps_current_month_snapshot(self):
+        self.compte.add_money(10)
+        self.compte.take_money(3)
+        snapshot = self.compte.snapshots.get()
+        self.assertEqual(snapshot.balance, 7)
+        self.assertEqual(snapshot.period_end, period_end(timezone.now()))
+
+    def test_balance_at_matches_ledger_with_backdated_writes(self):
+        for days, amount in ((0, 10), (40, 5), (70, -3), (95, 8)):
+            self._write(amount, self.start + timedelta(days=days))
+        # Écriture antidatée dans un mois qui a déjà un relevé
+        self._write(2, self.start + timedelta(days=1))
+
+        self.assertEqual(self.compte.snapshots.count(), 4)
+        for days in (-1, 0, 1, 20, 45, 80, 200):
+            when = self.start + timedelta(days=days)
+            self.assertEqual(self.compte.balance_at(when), self._ledger_balance(when), days)
+
+    def test_balance_at_reads_few_rows(self):
+        self._write(10, self.start)
+        self._write(5, self.start + timedelta(days=40))
+        with self.assertNumQueries(2):
+            self.assertEqual(self.compte.balance_at(self.start + timedelta(days=60)), 15)
+
+    def test_balance_series(self):
+        self._write(10, self.start)
+        self._write(5, self.start + timedelta(days=10))
+        series = self.compte.balance_series(self.start - timedelta(days=1), self.start + timedelta(days=13), timedelta(days=7))
+        self.assertEqual([balance for _, balance in series], [0, 10, 15])
+
+    def test_rebuild_matches_incremental_snapshots(self):
+        for days, amount in ((0, 10), (40, 5), (70, -3)):
+            self._write(amount, self.start + timedelta(days=days))
+        incremental = list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance'))
+        BalanceSnapshot.objects.rebuild([self.compte.pk])
+        self.assertEqual(list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance')), incremental)
+
+    def test_record_out_of_order_entries_matches_rebuild(self):
+        transactions = Transaction.objects.bulk_create([
+            Transaction(compte=self.compte, amount=5, created_at=self.start + timedelta(days=40)),
+            Transaction(compte=self.compte, amount=10, created_at=self.start),
+        ])
+        Compte.objects.filter(pk=self.compte.pk).update(balance=15)
+        BalanceSnapshot.objects.record([(t.compte_id, t.created_at, t.amount) for t in transactions])
+        recorded = list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance'))
+        BalanceSnapshot.objects.rebuild([self.compte.pk])
+        self.assertEqual(list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance')), recorded)
+        self.assertEqual([balance for _, balance in recorded], [10, 15])
+
+
+class TransactionInlinePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=cls.child)
+        start = timezone.now() - timedelta(days=30)
+        Transaction.objects.bulk_create([
+            Transaction(compte=cls.compte, amount=i, created_at=start + timedelta(days=i // 2))
+            for i in range(1, 26)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def test_change_page_renders_latest_transactions_only(self):
+        response = self.client.get(reverse('admin:app_compte_change', args=[self.compte.pk]))
+        self.assertContains(response, 'name="transactions-INITIAL_FORMS" value="10"')
+        self.assertContains(response, 'data-cursor=')
+
+    def test_fragment_walks_the_whole_history_by_cursor(self):
+        url = reverse('admin:app_compte_transactions', args=[self.compte.pk])
+        response = self.client.get(reverse('admin:app_compte_change', args=[self.compte.pk]))
+        formset = response.context['inline_admin_formsets'][0].formset
+        seen = [transaction.pk for transaction in formset.get_queryset()]
+        cursor = formset.next_cursor
+        while cursor:
+            response = self.client.get(url, {'cursor': cursor})
+            seen.extend(transaction.pk for transaction in response.context['transactions'])
+            cursor = response.get('X-Next-Cursor')
+        expected = list(self.compte.transactions.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_fragment_rejects_an_invalid_cursor(self):
+        url = reverse('admin:app_compte_transactions', args=[self.compte.pk])
+        for cursor in ('', 'pas-un-curseur', 'hier|1'):
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400, cursor)
+
+    def test_fragment_is_scoped_to_account_users(self):
+        stranger = User.objects.create_user('autre', is_staff=True)
+        self.client.force_login(stranger)
+        response = self.client.get(reverse('admin:app_compte_transactions', args=[self.compte.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=cls.child)
+        stranger = User.objects.create_user('autre', is_staff=True)
+        other = Compte.objects.create(name='Autre', manager=stranger, client=stranger)
+        start = timezone.now() - timedelta(days=30)
+        Transaction.objects.bulk_create([
+            Transaction(compte=compte, amount=i, created_at=start + timedelta(days=i // 3))
+            for i in range(1, 26)
+            for compte in (cls.compte, other)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def test_walks_all_visible_transactions_by_cursor(self):
+        url = reverse('admin:app_transaction_changelist')
+        seen = []
+        params = {}
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, params)
+            for query in context.captured_queries:
+                self.assertNotIn('OFFSET', query['sql'])
+            cl = response.context['cl']
+            seen.extend(transaction.pk for transaction in cl.result_list)
+            if not cl.next_cursor:
+                break
+            self.assertContains(response, 'Page suivante')
+            params = {'cursor': cl.next_cursor}
+        expected = list(self.compte.transactions.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(cl.result_count, 25)
+
+    def test_large_counts_are_shown_as_capped(self):
+        with mock.patch('app.pagination.COUNT_CAP', 5):
+            response = self.client.get(reverse('admin:app_transaction_changelist'))
+        self.assertContains(response, 'plus de 5')
+
+    def test_sorting_falls_back_to_page_numbers(self):
+        response = self.client.get(reverse('admin:app_transaction_changelist'), {'o': '2', 'p': '2'})
+        cl = response.context['cl']
+        self.assertIsNone(cl.keyset)
+        self.assertEqual(cl.paginator.num_pages, 3)
+        self.assertEqual(len(cl.result_list), 10)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('admin:app_transaction_changelist'), {'cursor': 'abc'})
+        self.assertRedirects(response, reverse('admin:app_transaction_changelist') + '?e=1', fetch_redirect_response=False)
+
+    def test_compte_changelist_uses_keyset(self):
+        response = self.client.get(reverse('admin:app_compte_changelist'))
+        cl = response.context['cl']
+        self.assertEqual(cl.keyset, ('-id',))
+        self.assertEqual([compte.pk for compte in cl.result_list], [self.compte.pk])
+
+    def test_estimate_count_of_an_empty_in_filter(self):
+        self.assertEqual(estimate_count(Transaction.objects.filter(compte_id__in=[])), 0)
+        self.assertEqual(estimate_count(Transaction.objects.filter(compte=self.compte)), 25)
+
+
+class FullTextSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Tirelire de Léa', manager=cls.parent, client=cls.child)
+        stranger = User.objects.create_user('autre', is_staff=True)
+        cls.other = Compte.objects.create(name='Autre tirelire', manager=stranger, client=stranger)
+        cls.compte.add_money(10, description='Argent de poche')
+        cls.compte.add_money(5, description='Anniversaire de mamie')
+        cls.compte.add_money(2, description='Argent de poche, argent retrouvé')
+        cls.other.add_money(10, description='Argent de poche')
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+
+    def _search(self, name, term):
+        response = self.client.get(reverse(f'admin:app_{name}_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_transactions_are_ranked_and_scoped(self):
+        results = self._search('transaction', 'argent')
+        self.assertEqual([t.description for t in results], ['Argent de poche, argent retrouvé', 'Argent de poche'])
+        self.assertTrue(all(t.compte_id == self.compte.pk for t in results))
+
+    def test_matches_prefixes_account_names_and_ignores_accents(self):
+        self.assertEqual(len(self._search('transaction', 'lea anniv')), 1)
+        self.assertEqual([c.pk for c in self._search('compte', 'tire')], [self.compte.pk])
+
+    def test_operators_in_the_search_term_are_escaped(self):
+        self.assertEqual(self._search('transaction', '"argent" OR NEAR('), [])
+
+    def test_index_follows_renames_and_compaction(self):
+        self.compte.name = 'Compte de Léa'
+        self.compte.save()
+        self.assertEqual(len(self._search('transaction', 'compte lea')), 3)
+
+        compact_compte(self.compte.pk, timezone.now())
+        self.assertEqual([t.description for t in self._search('transaction', 'situation')], [
+            f"Situation au {timezone.localtime().strftime('%d/%m/%Y')}",
+        ])
+        self.assertEqual(self._search('transaction', 'anniversaire'), [])
+
+    def test_triggers_exist_after_migrate(self):
+        self.assertEqual(check_search_triggers(databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER app_compte_search_update")
+        errors = check_search_triggers(databases=['default'])
+        self.assertEqual([error.id for error in errors], ['app.E001'])
+        self.assertIn('app_compte_search_update', errors[0].msg)
+
+
+class ExportImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=cls.child)
+        stranger = User.objects.create_user('autre', is_staff=True)
+        cls.other = Compte.objects.create(name='Autre', manager=stranger, client=stranger)
+        cls.compte.add_money(Decimal('10.10'), description='Argent de poche')
+        cls.compte.take_money(Decimal('2.55'), description='Bonbons, "gros" paquet')
+        cls.other.add_money(7)
+
+    def setUp(self):
+        self.client.force_login(self.parent)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def _import(self, content, name, *args):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding='utf-8')
+        call_command('import_transactions', str(path), *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_csv_export_is_scoped_to_visible_accounts(self):
+        content = self._export(reverse('admin:app_transaction_export_csv'))
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'compte,created_at,amount,description')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Bonbons, ""gros"" paquet"', content)
+
+    def test_export_of_another_account_is_denied(self):
+        response = self.client.get(reverse('admin:app_compte_export_transactions_csv', args=[self.other.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_round_trip_updates_balances_and_snapshots(self):
+        # Chaque import double l'historique : l'export suivant le contient déjà
+        for format in ('csv', 'jsonl'):
+            content = self._export(reverse(f'admin:app_compte_export_transactions_{format}', args=[self.compte.pk]))
+            self._import(content, f'export.{format}', '--chunk-size', '1')
+        self.compte.refresh_from_db()
+        self.assertEqual(self.compte.transactions.count(), 8)
+        self.assertEqual(self.compte.balance, Decimal('30.20'))
+        self.assertEqual(self.compte.balance_at(timezone.now()), Decimal('30.20'))
+        out = StringIO()
+        call_command('check_balances', '--dry-run', stdout=out)
+        self.assertIn('cohérents', out.getvalue())
+
+    def test_chunked_backdated_import_keeps_snapshots_consistent(self):
+        rows = [
+            {'compte': self.compte.pk, 'created_at': created_at, 'amount': amount, 'description': ''}
+            for created_at, amount in (
+                ('2024-03-05T10:00:00+00:00', '4'),
+                ('2024-01-05T10:00:00+00:00', '5'),
+                ('2024-02-05T10:00:00+00:00', '-1'),
+                ('2024-01-20T10:00:00+00:00', '2'),
+            )
+        ]
+        self._import('\n'.join(json.dumps(row) for row in rows) + '\n', 'import.jsonl', '--chunk-size', '2')
+        self.compte.refresh_from_db()
+        self.assertEqual(self.compte.balance, Decimal('17.55'))
+        imported = list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance'))
+        BalanceSnapshot.objects.rebuild([self.compte.pk])
+        self.assertEqual(list(self.compte.snapshots.order_by('period_end').values_list('period_end', 'balance')), imported)
+
+    def test_interrupted_import_resumes_with_skip(self):
+        rows = [
+            {'compte': self.compte.pk, 'created_at': f'2024-01-0{day}T10:00:00+00:00', 'amount': '1', 'description': ''}
+            for day in range(1, 6)
+        ]
+        path = Path(self.tmp.name) / 'import.jsonl'
+        path.write_text('\n'.join(json.dumps(row) for row in rows) + '\n', encoding='utf-8')
+        insert = ImportCommand._insert
+        calls = []
+
+        def failing_insert(command, chunk):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise OperationalError('database is locked')
+            return insert(command, chunk)
+
+        stderr = StringIO()
+        with mock.patch.object(ImportCommand, '_insert', failing_insert), self.assertRaises(OperationalError):
+            call_command('import_transactions', str(path), '--chunk-size', '2', stdout=StringIO(), stderr=stderr)
+        self.assertIn('--skip 2', stderr.getvalue())
+
+        call_command('import_transactions', str(path), '--chunk-size', '2', '--skip', '2', stdout=StringIO(), stderr=StringIO())
+        self.compte.refresh_from_db()
+        self.assertEqual(self.compte.balance, Decimal('12.55'))
+        self.assertEqual(self.compte.transactions.count(), 7)
+
+    def test_invalid_file_imports_nothing(self):
+        rows = [
+            {'compte': self.compte.pk, 'created_at': '2024-01-05T10:00:00+00:00', 'amount': '5', 'description': 'ok'},
+            {'compte': self.compte.pk, 'created_at': 'hier', 'amount': '5', 'description': ''},
+            {'compte': self.compte.pk, 'created_at': '2024-01-05T10:00:00+00:00', 'amount': '1.234', 'description': ''},
+            {'compte': 999999, 'created_at': '2024-01-05T10:00:00+00:00', 'amount': '1', 'description': ''},
+            {'compte': self.compte.pk, 'created_at': '2024-01-05T10:00:00+00:00', 'amount': '1e30', 'description': ''},
+            {'compte': self.compte.pk, 'created_at': '2024-01-05T10:00:00+00:00', 'amount': '100000000000000000', 'description': ''},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\n{pas du json\n'
+        with self.assertRaisesMessage(CommandError, '6 erreur(s)'):
+            self._import(content, 'import.jsonl')
+        self.assertEqual(Transaction.objects.count(), 3)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', salary=5, manager=cls.parent, client=cls.child)
+        stranger = User.objects.create_user('autre', is_staff=True)
+        cls.other = Compte.objects.create(name='Autre', manager=stranger, client=stranger)
+        for amount in range(1, 26):
+            cls.compte.add_money(amount)
+
+    def setUp(self):
+        self.client.force_login(self.child)
+        self.url = reverse('api_compte', args=[self.compte.pk])
+
+    def test_summary_is_scoped_to_account_users(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['balance'], '325.00')
+        self.assertEqual(self.client.get(reverse('api_comptes')).json()['comptes'][0]['id'], self.compte.pk)
+        self.assertEqual(self.client.get(reverse('api_compte', args=[self.other.pk])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_not_modified_does_not_read_transactions(self):
+        etag = self.client.get(self.url)['ETag']
+        for url in (self.url, reverse('api_compte_transactions', args=[self.compte.pk])):
+            etag = self.client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertFalse([q for q in context.captured_queries if 'app_transaction' in q['sql']])
+
+        self.compte.add_money(1)
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_transactions_are_paginated_by_cursor(self):
+        url = reverse('api_compte_transactions', args=[self.compte.pk])
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['transactions']), 20)
+        self.assertEqual(first['transactions'][0]['amount'], '25.00')
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual([t['amount'] for t in second['transactions']], ['5.00', '4.00', '3.00', '2.00', '1.00'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_accounts_are_paginated_by_cursor(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        url = reverse('api_comptes')
+        with mock.patch('app.api.COMPTES_PER_PAGE', 1):
+            first = self.client.get(url).json()
+            self.assertEqual([c['id'] for c in first['comptes']], [self.compte.pk])
+            second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+            self.assertEqual([c['id'] for c in second['comptes']], [self.other.pk])
+            self.assertIsNone(second['next_cursor'])
+        self.assertEqual(self.client.get(url, {'cursor': 'abc'}).status_code, 400)
+
+
+class SummaryCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', salary=5, manager=cls.parent, client=cls.child)
+        cls.compte.add_money(10)
+
+    def setUp(self):
+        self.client.force_login(self.child)
+        self.url = reverse('api_compte', args=[self.compte.pk])
+
+    def _balance(self):
+        return self.client.get(self.url).json()['balance']
+
+    def test_warm_reads_stay_out_of_the_ledger_tables(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self._balance(), '10.00')
+        self.assertFalse([q for q in context.captured_queries if 'app_compte' in q['sql'] or 'app_transaction' in q['sql']])
+        self.assertGreaterEqual(cache_stats()['hits'], 2)
+
+    def test_write_paths_invalidate_the_summary(self):
+        self.assertEqual(self._balance(), '10.00')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.compte.take_money(3)
+        self.assertTrue(callbacks)
+        self.assertEqual(self._balance(), '7.00')
+
+        pay_due_salaries(now=timezone.now())
+        self.assertEqual(self._balance(), '12.00')
+
+        version = self.client.get(self.url).json()['version']
+        self.compte.compress_transactions()
+        self.assertGreater(self.client.get(self.url).json()['version'], version)
+
+    def test_new_account_invalidates_access(self):
+        self.assertEqual(len(self.client.get(reverse('api_comptes')).json()['comptes']), 1)
+        Compte.objects.create(name='Deuxième', manager=self.parent, client=self.child)
+        self.assertEqual(len(self.client.get(reverse('api_comptes')).json()['comptes']), 2)
+
+
+class ReadReplicaRouterTests(TestCase):
+    def test_reads_use_the_replica_outside_transactions(self):
+        router = ReadReplicaRouter()
+        # En test, replica est un miroir de default
+        self.assertEqual(router.db_for_read(Compte), 'default')
+        with mock.patch('app.routers._has_own_replica', return_value=True):
+            self.assertEqual(router.db_for_read(Compte), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', False):
+                self.assertEqual(router.db_for_read(Compte), 'replica')
+        self.assertEqual(router.db_for_write(Compte), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'app'))
+
+
+class LiveBalanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=cls.child)
+        cls.compte.add_money(10)
+        stranger = User.objects.create_user('autre', is_staff=True)
+        cls.other = Compte.objects.create(name='Autre', manager=stranger, client=stranger)
+
+    async def test_async_summary_is_scoped(self):
+        await self.async_client.aforce_login(self.child)
+        response = await self.async_client.get(reverse('live_compte', args=[self.compte.pk]))
+        self.assertEqual(json.loads(response.content)['balance'], '10.00')
+        response = await self.async_client.get(reverse('live_compte', args=[self.other.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_event_stream_pushes_new_balances(self):
+        await self.async_client.aforce_login(self.child)
+        response = await self.async_client.get(reverse('live_compte_events', args=[self.compte.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertIn('"balance": "10.00"', (await anext(events)).decode())
+
+        # Ce que fait invalidate_comptes après le commit d'une écriture
+        await sync_to_async(self.compte.add_money)(5)
+        await sync_to_async(publish_balances)([self.compte.pk])
+        self.assertIn('"balance": "15.00"', (await anext(events)).decode())
+
+    async def test_cache_broker_sends_messages_published_after_subscribing(self):
+        broker = CacheBroker()
+        broker.poll_interval = 0.01
+        name = channel(self.compte.pk)
+        await sync_to_async(broker.publish)(name, 'avant')
+        subscription = await broker.asubscribe(name)
+        self.assertIsNone(await subscription.next(timeout=0.05))
+        await sync_to_async(broker.publish)(name, 'après')
+        self.assertEqual(await subscription.next(timeout=1), 'après')
+        subscription.close()
+        await asyncio.sleep(0.05)
+        # Plus d'abonné : le poller du processus s'arrête
+        self.assertIsNone(broker._poller)
+
+    def test_cache_broker_publishes_only_for_followed_channels(self):
+        broker = CacheBroker()
+        with mock.patch('app.events.get_broker', return_value=broker), self.assertNumQueries(0):
+            publish_balances([self.compte.pk, self.other.pk])
+        cache.set(broker._listening_key(channel(self.compte.pk)), True)
+        self.assertEqual(broker.wanted([channel(self.compte.pk), channel(self.other.pk)]), {channel(self.compte.pk)})
+        with mock.patch('app.events.get_broker', return_value=broker), self.assertNumQueries(1):
+            publish_balances([self.compte.pk, self.other.pk])
+        self.assertEqual(cache.get(broker._seq_key(channel(self.compte.pk))), 1)
+
+
+class BulkOnboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = User.objects.create_user('existant', is_staff=True)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _onboard(self, content, name, *args):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding='utf-8')
+        out = StringIO()
+        call_command('bulk_onboard', str(path), '--workers', '1', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_json_families_are_linked_to_their_parent(self):
+        families = [
+            {'username': 'maman', 'password': 's3cret-Maman', 'email': 'maman@example.com', 'children': [
+                {'username': 'lea', 'first_name': 'Léa', 'salary': '2.50'},
+                {'username': 'tom', 'compte': 'Tom'},
+            ]},
+            {'username': 'noe', 'parent': 'existant'},
+        ]
+        out = self._onboard(json.dumps(families), 'familles.json', '--chunk-size', '2')
+        self.assertIn('4 utilisateur(s)', out)
+        maman = User.objects.get(username='maman')
+        self.assertTrue(maman.is_staff)
+        self.assertTrue(maman.check_password('s3cret-Maman'))
+        self.assertFalse(User.objects.get(username='lea').has_usable_password())
+        self.assertEqual(
+            set(Compte.objects.filter(manager=maman).values_list('name', 'client__username', 'salary')),
+            {('Léa', 'lea', Decimal('2.50')), ('Tom', 'tom', Decimal('0.00'))},
+        )
+        self.assertTrue(Compte.objects.filter(manager=self.existing, client__username='noe').exists())
+
+    def test_new_parents_see_their_children_accounts(self):
+        self._onboard('username,parent\nmaman,\nlea,maman\n', 'familles.csv')
+        compte = Compte.objects.get(client__username='lea')
+        self.client.force_login(User.objects.get(username='maman'))
+        response = self.client.get(reverse('admin:app_compte_change', args=[compte.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_file_onboards_nobody(self):
+        content = 'username,parent,salary\nmaman,,\nlea,papa,\ntom,maman,-1\nexistant,,\nmaman,,\n'
+        with self.assertRaisesMessage(CommandError, '4 erreur(s)'):
+            self._onboard(content, 'familles.csv')
+        self.assertEqual(User.objects.count(), 1)
+
+
+class SeedLedgerTests(TestCase):
+    def test_same_seed_same_ledger(self):
+        until = timezone.make_aware(datetime(2024, 6, 1))
+        ledgers = []
+        for prefix in ('a', 'b'):
+            compte_ids = seed_ledger(6, 4, 300, seed=7, until=until, prefix=prefix)
+            ledgers.append([
+                list(Transaction.objects.filter(compte_id=pk).order_by('created_at', 'amount').values_list('created_at', 'amount'))
+                for pk in compte_ids
+            ])
+        self.assertEqual(ledgers[0], ledgers[1])
+        # Loi de Zipf : le premier compte est le plus actif
+        counts = [len(transactions) for transactions in ledgers[0]]
+        self.assertEqual(counts[0], max(counts))
+        self.assertEqual(sum(counts), 300)
+        out = StringIO()
+        call_command('check_balances', '--dry-run', stdout=out)
+        self.assertIn('cohérents', out.getvalue())
+
+    def test_benchmarks_leave_the_data_unchanged(self):
+        results = run_benchmarks(4, 3, 200, repeat=1)
+        self.assertEqual([result['case'] for result in results], list(BENCH_CASES))
+        self.assertTrue(all(result['queries'] > 0 for result in results))
+        self.assertEqual(Transaction.objects.count(), 200)
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'app.profiling.ProfilingMiddleware'})
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin')
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=cls.parent)
+
+    def setUp(self):
+        profiling.buffer.clear()
+        self.addCleanup(profiling.buffer.clear)
+
+    def test_requests_are_recorded_and_summarized(self):
+        self.client.force_login(self.parent)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sample_file = Path(tmp.name) / 'profil.jsonl'
+        with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_SAMPLE_FILE=str(sample_file)):
+            for _ in range(3):
+                self.client.get(reverse('admin:app_compte_change', args=[self.compte.pk]))
+        records = profiling.buffer.snapshot()
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]['view'], 'admin:app_compte_change')
+        self.assertGreater(records[0]['queries'], 0)
+        self.assertLessEqual(len(records[0]['slowest']), profiling.SLOWEST_STATEMENTS)
+        self.assertEqual(len(sample_file.read_text().splitlines()), 3)
+
+        summary = profiling.summarize(records)
+        self.assertEqual(summary['views'][0]['count'], 3)
+        self.assertEqual(summary['views'][0]['p99'], max(record['ms'] for record in records))
+
+    async def test_async_views_are_measured_without_adapter(self):
+        async def get_response(request):
+            pass
+        self.assertTrue(iscoroutinefunction(profiling.ProfilingMiddleware(get_response)))
+
+        await self.async_client.aforce_login(self.parent)
+        response = await self.async_client.get(reverse('live_compte', args=[self.compte.pk]))
+        self.assertEqual(response.status_code, 200)
+        records = profiling.buffer.snapshot()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['view'], 'live_compte')
+        self.assertGreater(records[0]['queries'], 0)
+
+    def test_dashboard_is_for_superusers(self):
+        self.client.force_login(self.parent)
+        self.assertEqual(self.client.get(reverse('admin:app_compte_performance')).status_code, 403)
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin:app_compte_changelist'))
+        response = self.client.get(reverse('admin:app_compte_performance'))
+        self.assertContains(response, 'admin:app_compte_changelist')
+
+
+class WeeklyRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.child = User.objects.create_user('enfant', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', salary=2, manager=cls.parent, client=cls.child)
+        cls.sister = Compte.objects.create(name='Soeur', manager=cls.parent, client=User.objects.create_user('soeur'))
+        start = timezone.now() - timedelta(days=60)
+        for day in range(0, 60, 3):
+            Transaction.objects.create(compte=cls.compte, amount=5, created_at=start + timedelta(days=day))
+            Transaction.objects.create(compte=cls.compte, amount=-2, created_at=start + timedelta(days=day, hours=1))
+        Compte.objects.all().rebuild_balances()
+        WeeklyRollup.objects.rebuild([cls.compte.pk, cls.sister.pk])
+
+    def _rollups(self):
+        return sorted(WeeklyRollup.objects.values_list('compte_id', 'week', 'credit', 'debit', 'count'))
+
+    def test_write_paths_match_a_rebuild(self):
+        self.compte.add_money(3)
+        self.compte.take_money(1)
+        self.sister.add_money(4)
+        pay_due_salaries(now=timezone.now())
+        incremental = self._rollups()
+        WeeklyRollup.objects.rebuild([self.compte.pk, self.sister.pk])
+        self.assertEqual(self._rollups(), incremental)
+        rollups = WeeklyRollup.objects.filter(compte=self.compte)
+        self.assertEqual(sum(r.credit - r.debit for r in rollups), self.compte.transactions.get_total_amount())
+
+    def test_compaction_keeps_the_weekly_history(self):
+        before = self._rollups()
+        compact_compte(self.compte.pk, timezone.now() - timedelta(days=20))
+        self.assertEqual(self._rollups(), before)
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self._rollups(), before)
+
+    def test_dashboard_reads_rollups_only(self):
+        self.client.force_login(self.parent)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('admin:app_compte_weekly_dashboard'))
+        self.assertContains(response, 'Soeur')
+        self.assertFalse(any('app_transaction' in query['sql'] for query in context.captured_queries))
+
+
+class WorkerProfileTests(SimpleTestCase):
+    def test_batch_modules_load_without_the_admin(self):
+        code = (
+            "import sys, django; django.setup(); import app.payroll, app.compaction, app.models; "
+            "print(sorted(name for name in sys.modules if name.startswith(('unfold', 'django.contrib.admin', 'app.admin'))))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='argentdepoche.settings_worker')
+        process = subprocess.run([sys.executable, '-c', code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), '[]')
+
+
+class StaticFilesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root.name))
+        cls.addClassCleanup(cls.static_root.cleanup)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        super().setUpClass()
+        manifest = json.loads((Path(cls.static_root.name) / 'staticfiles.json').read_text())
+        cls.hashed = manifest['paths']['css/style.css']
+
+    def test_hashed_name_is_served_compressed_and_immutable(self):
+        self.assertNotEqual(self.hashed, 'css/style.css')
+        self.assertTrue((Path(self.static_root.name) / (self.hashed + '.gz')).is_file())
+        response = self.client.get('/static/' + self.hashed, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        original = (Path(self.static_root.name) / self.hashed).read_bytes()
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+
+    def test_plain_name_and_revalidation(self):
+        response = self.client.get('/static/css/style.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = self.client.get('/static/css/style.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/static/../settings.py').status_code, 404)
+
+    def test_pages_reference_hashed_names(self):
+        self.assertContains(self.client.get(reverse('index')), '/static/' + self.hashed)
+
+    def test_refused_gzip_serves_the_plain_file(self):
+        for header in ('gzip;q=0, deflate', 'br, *;q=0', 'identity'):
+            with self.subTest(header):
+                response = self.client.get('/static/' + self.hashed, HTTP_ACCEPT_ENCODING=header)
+                self.assertNotIn('Content-Encoding', response)
+        for header in ('deflate, gzip;q=0.5', '*'):
+            with self.subTest(header):
+                response = self.client.get('/static/' + self.hashed, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    async def test_async_stack_serves_files(self):
+        self.assertTrue(StaticFilesMiddleware.async_capable)
+        response = await self.async_client.get('/static/' + self.hashed, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(gzip.decompress(content), (Path(self.static_root.name) / self.hashed).read_bytes())
+
+    async def test_async_stack_streams_large_files(self):
+        path = Path(self.static_root.name) / 'large.bin'
+        path.write_bytes(os.urandom(FileResponse.block_size * 3 + 1))
+        self.addCleanup(path.unlink)
+        opened = []
+        path_open = Path.open
+
+        def tracking_open(self, *args, **kwargs):
+            opened.append(path_open(self, *args, **kwargs))
+            return opened[-1]
+
+        with mock.patch.object(Path, 'open', tracking_open):
+            response = await self.async_client.get('/static/large.bin')
+        content = aiter(response.streaming_content)
+        chunks = [await anext(content)]
+        # Lu morceau par morceau, pas en entier avant l'envoi
+        self.assertEqual(opened[-1].tell(), FileResponse.block_size)
+        chunks += [chunk async for chunk in content]
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), path.read_bytes())
+
+    def test_manifest_written_after_startup_is_used(self):
+        root = Path(self.static_root.name)
+        self.client.get('/static/css/style.css')
+        manifest_path = root / 'staticfiles.json'
+        original = manifest_path.read_text()
+        self.addCleanup(manifest_path.write_text, original)
+        manifest = json.loads(original)
+        manifest['paths']['late.txt'] = 'late.0123456789ab.txt'
+        (root / 'late.0123456789ab.txt').write_text('tard')
+        manifest_path.write_text(json.dumps(manifest))
+        mtime = manifest_path.stat().st_mtime + 10
+        os.utime(manifest_path, (mtime, mtime))
+        response = self.client.get('/static/late.0123456789ab.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+class StatementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = User.objects.create_user('parent', is_staff=True)
+        cls.compte = Compte.objects.create(name='Enfant', manager=cls.parent, client=User.objects.create_user('enfant'))
+        cls.idle = Compte.objects.create(name='Inactif', manager=cls.parent, client=User.objects.create_user('inactif'))
+        cls.month = date(2024, 3, 1)
+        for day, amount in ((5, 10), (10, -3), (30, 4), (40, 2)):
+            created_at = timezone.make_aware(datetime(2024, 2, 1)) + timedelta(days=day)
+            Transaction.objects.create(compte=cls.compte, amount=amount, description=f'J{day}', created_at=created_at)
+        Transaction.objects.create(compte=cls.idle, amount=8, created_at=timezone.make_aware(datetime(2024, 1, 10)))
+        Compte.objects.all().rebuild_balances()
+        BalanceSnapshot.objects.rebuild([cls.compte.pk, cls.idle.pk])
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _generate(self, *args):
+        out = StringIO()
+        call_command('generate_statements', '--month', '2024-03', '--output', self.tmp.name, '--workers', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def _csv(self):
+        return (Path(self.tmp.name) / '2024-03' / f'compte-{self.compte.pk}.csv').read_text(encoding='utf-8').splitlines()
+
+    def test_writes_active_accounts_and_resumes(self):
+        self.assertIn('1 relevé(s) de 2024-03 écrit(s)', self._generate())
+        lines = self._csv()
+        self.assertEqual(lines[0], 'date,description,montant,solde')
+        self.assertEqual(lines[1], "2024-03-01,Solde d'ouverture,,7.00")
+        self.assertEqual([line.split(',')[2] for line in lines[2:-1]], ['4.00', '2.00'])
+        self.assertEqual(lines[-1], '2024-03-31,Solde de clôture,,13.00')
+        html = (Path(self.tmp.name) / '2024-03' / f'compte-{self.compte.pk}.html').read_text(encoding='utf-8')
+        self.assertIn('Enfant', html)
+        self.assertIn('J30', html)
+        self.assertFalse((Path(self.tmp.name) / '2024-03' / f'compte-{self.idle.pk}.html').exists())
+
+        self.assertIn('0 relevé(s) de 2024-03 écrit(s)', self._generate())
+        self.assertIn('1 déjà présent(s)', self._generate())
+        self.assertIn('1 relevé(s) de 2024-03 écrit(s)', self._generate('--force'))
+
+    def test_archived_months_read_the_archive(self):
+        self._generate()
+        expected = self._csv()
+        compact_compte(self.compte.pk, timezone.make_aware(datetime(2024, 4, 15)), archive=True)
+        self._generate('--force')
+        self.assertEqual(self._csv(), expected)
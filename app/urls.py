@@ -1,7 +1,13 @@
 from django.urls import path
-from . import views
+from . import api, live, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('register/', views.register, name='register'),
+    path('api/cache/stats/', api.cache_stats, name='api_cache_stats'),
+    path('api/comptes/', api.comptes, name='api_comptes'),
+    path('api/comptes/<int:compte_id>/', api.compte, name='api_compte'),
+    path('api/comptes/<int:compte_id>/transactions/', api.compte_transactions, name='api_compte_transactions'),
+    path('live/comptes/<int:compte_id>/', live.compte_summary, name='live_compte'),
+    path('live/comptes/<int:compte_id>/events/', live.compte_events, name='live_compte_events'),
 ]
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib import messages
+from django.db.transaction import atomic
 from .forms import CustomUserCreationForm
 from app.models import Compte
 
@@ -12,16 +13,17 @@ def register(request):
     if request.method == "POST":
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
-            user = form.save()
+            user = form.save(commit=False)
             user.is_staff = True
-            user.save()
-            # Crée un compte d'argent de poche pour l'utilisateur
-            Compte.objects.create(
-                name=user.username,
-                client=user,
-                manager=user,  # ou choisir un manager par défaut
-                salary=0
-            )
+            with atomic():
+                user.save()
+                # Crée un compte d'argent de poche pour l'utilisateur
+                Compte.objects.create(
+                    name=user.username,
+                    client=user,
+                    manager=user,  # ou choisir un manager par défaut
+                    salary=0
+                )
             login(request, user)
             messages.success(request, "Votre compte a été créé. Vous pouvez maintenant accéder à l'administration.")
             return redirect("index")
@@ -0,0 +1,37 @@
+"""
+Répartition de traitements par lots sur un pool de processus.
+
+Les fonctions sont passées par leur chemin pointé (``'app.compaction.compact_compte'``)
+et importées dans chaque processus après ``django.setup()``, ce qui fonctionne
+aussi bien avec ``fork`` qu'avec ``spawn``.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+
+def _init_worker():
+    import django
+    from django.db import connections
+
+    django.setup()
+    # Chaque processus ouvre ses propres connexions à la base
+    connections.close_all()
+
+
+def _call(path, item, kwargs):
+    from django.utils.module_loading import import_string
+
+    return import_string(path)(item, **kwargs)
+
+
+def map_in_processes(path:str, items, workers:int, chunksize:int = 1, **kwargs):
+    """
+    Applique la fonction ``path`` à chaque élément de ``items`` dans ``workers`` processus.
+    Les arguments nommés supplémentaires sont transmis à chaque appel.
+    """
+    from django.db import connections
+
+    # Les connexions ouvertes ne doivent pas être partagées avec les processus fils
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(partial(_call, path, kwargs=kwargs), items, chunksize=chunksize)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,14 +79,75 @@ WSGI_APPLICATION = 'argentdepoche.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# 'default' écrit : WAL pour que les lectures ne bloquent pas les écritures,
+# transactions IMMEDIATE (le verrou d'écriture est pris dès le BEGIN, pas au
+# milieu de la transaction) et attente de 5 s si la base est occupée.
+# 'replica' lit le même fichier en lecture seule (voir app.routers).
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;PRAGMA busy_timeout=5000',
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=ON;PRAGMA busy_timeout=5000',
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['app.routers.ReadReplicaRouter']
+
+
+# Diffusion des soldes en direct (app.events) : 'app.events.InProcessBroker'
+# pour un seul processus, 'app.events.CacheBroker' (par le cache fichier) pour
+# plusieurs processus sur la même machine.
+
+EVENTS_BROKER = os.environ.get('EVENTS_BROKER', 'app.events.InProcessBroker')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Cache fichier partagé par tous les processus de la machine (serveurs web,
+# tâches de fond de worker.py) : une écriture faite par un processus invalide
+# les résumés de comptes et les droits d'accès gardés par les autres. CACHE_DIR
+# change son emplacement.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
 
+# Profilage des requêtes (app.profiling), pour trouver les pages lentes en
+# production : PROFILING=1 active le middleware, le tableau de bord est dans
+# l'administration des comptes. PROFILING_SAMPLE_RATE (entre 0 et 1) des
+# mesures sont aussi écrites dans PROFILING_SAMPLE_FILE.
+
+PROFILING_BUFFER_SIZE = int(os.environ.get('PROFILING_BUFFER_SIZE', 1000))
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SAMPLE_FILE = os.environ.get('PROFILING_SAMPLE_FILE')
+if os.environ.get('PROFILING'):
+    MIDDLEWARE.insert(0, 'app.profiling.ProfilingMiddleware')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -123,9 +185,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-STATICFILES_DIRS = (
-    os.path.join(BASE_DIR, "app/static/"),
-)
+# app/static est trouvé par AppDirectoriesFinder : le lister aussi dans
+# STATICFILES_DIRS faisait collecter chaque fichier deux fois
+
+# collectstatic y écrit les fichiers avec empreinte et leurs copies .gz, servis
+# par app.staticfiles.StaticFilesMiddleware ou par nginx (deploy/nginx.conf)
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'app.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -0,0 +1,29 @@
+"""
+Profil des tâches de fond (cron, ``worker.py``) : uniquement les modèles du
+grand livre et les applications dont ils dépendent.
+
+Pas d'Unfold, d'administration, de sessions, de messages ni de fichiers
+statiques : une commande courte (``pay_salaries``, ``compact_transactions``, ...)
+ne paie pas leur import ni leur enregistrement au démarrage. Les commandes qui
+ont besoin de l'administration ou des vues passent par ``manage.py``.
+"""
+from argentdepoche.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'app',
+]
+
+MIDDLEWARE = []
+
+# Les vérifications système des commandes importent ROOT_URLCONF
+ROOT_URLCONF = 'argentdepoche.urls_worker'
+
+# Seulement les gabarits de l'application (relevés mensuels), sans processeurs de contexte
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'APP_DIRS': True,
+    },
+]
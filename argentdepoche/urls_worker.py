@@ -0,0 +1,4 @@
+"""
+URLs du profil des tâches de fond (``settings_worker``) : aucune vue.
+"""
+urlpatterns = []
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+"""
+Point d'entrée des tâches de fond : comme manage.py, avec le profil léger
+``argentdepoche.settings_worker`` (pas d'administration ni d'Unfold).
+
+    python worker.py pay_salaries
+    python worker.py compact_transactions --before 2024-01-01
+"""
+import os
+import sys
+
+
+def main():
+    # Pas de setdefault : DJANGO_SETTINGS_MODULE vaut souvent le profil complet sur le serveur
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'argentdepoche.settings_worker'
+    from django.core.management import execute_from_command_line
+    execute_from_command_line(sys.argv)
+
+
+if __name__ == '__main__':
+    main()